@@ -1,14 +1,193 @@
+import asyncio
+import logging
 import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
 
+from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError, ServerSelectionTimeoutError
+
+from app.utils.categories import category_registry
+from app.utils.metrics import command_listener, pool_listener
+
+logger = logging.getLogger(__name__)
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URI)
-db = client.map_my_world
+MONGO_DATABASE = os.getenv("MONGO_DATABASE", "map_my_world")
+CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "10")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000")),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+}
+HEALTH_CHECK_INTERVAL = float(os.getenv("MONGO_HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("MONGO_HEALTH_CHECK_TIMEOUT", "1"))
+DATABASE_ERRORS = (ConnectionError, ConnectionFailure)
+
+# Motor connects lazily, so building the client at import time does no I/O; the lifespan warms it up.
+client = AsyncIOMotorClient(MONGO_URI, event_listeners=[command_listener, pool_listener], **CLIENT_OPTIONS)
+db = client[MONGO_DATABASE]
 locations_collection = db.locations
 categories_collection = db.categories
 reviews_collection = db.location_category_reviews
+counters_collection = db.counters
+heatmap_collection = db.heatmap_cells
+history_collection = db.review_history
+category_registry.bind(categories_collection, counters_collection)
+
+REVIEWS_INDEXES = [
+    IndexModel([("last_reviewed", ASCENDING), ("_id", ASCENDING)], name="last_reviewed_id"),
+    # Category pages: equality prefix, then the same (last_reviewed, _id) order as the main scan.
+    IndexModel(
+        [("category_id", ASCENDING), ("last_reviewed", ASCENDING), ("_id", ASCENDING)],
+        name="category_last_reviewed_id",
+    ),
+    # bbox pages and $geoNear: bounds the scan to stale reviews in the area, but a 2dsphere prefix can't return
+    # them in page order, so bbox pages are sorted in memory.
+    IndexModel([("geo", GEOSPHERE), ("last_reviewed", ASCENDING), ("_id", ASCENDING)], name="geo_last_reviewed_id"),
+    # Live heatmap precisions: anchored geohash prefixes become ranges and the grouped fields are covered.
+    IndexModel([("geohash", ASCENDING), ("last_reviewed", ASCENDING)], name="geohash_last_reviewed"),
+]
+# Dropped at startup. ``geo_2dsphere`` is covered by ``geo_last_reviewed_id`` and $geoNear refuses to pick
+# between two 2dsphere indexes; ``location_category_unique`` keyed reviews by the embedded category name.
+OBSOLETE_REVIEWS_INDEXES = ["geo_2dsphere", "location_category_unique"]
+REVIEW_KEY_INDEX = IndexModel(
+    [("location.latitude", ASCENDING), ("location.longitude", ASCENDING), ("category_id", ASCENDING)],
+    name="location_category_id_unique",
+    unique=True,
+)
+CATEGORIES_INDEXES = [IndexModel([("name", ASCENDING)], name="name_unique", unique=True)]
+# One bucket per review and month; per-review statistics read a range of the first, per-category ones the second.
+HISTORY_INDEXES = [
+    IndexModel([("review_id", ASCENDING), ("month", ASCENDING)], name="review_month_unique", unique=True),
+    IndexModel([("category_id", ASCENDING), ("month", ASCENDING)], name="category_month"),
+]
+
+
+class DatabaseHealth:
+    def __init__(self):
+        # None until the first check, so the app still serves requests when no lifespan ran.
+        self.available: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+        # Indexes and the category registry are set up once, on the first contact with the server.
+        self.initialized = False
+
+    def mark(self, available: bool, latency_ms: Optional[float] = None, error: Optional[str] = None):
+        self.available = available
+        self.latency_ms = latency_ms
+        self.error = error
+        self.checked_at = datetime.now(timezone.utc)
+
+    def to_json(self):
+        return {
+            "available": self.available,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            "initialized": self.initialized,
+        }
+
+
+health = DatabaseHealth()
+_health_task: Optional[asyncio.Task] = None
 
 
 def get_reviews_collection():
+    if health.available is False:
+        return None
     return reviews_collection
+
+
+def get_heatmap_collection():
+    if health.available is False:
+        return None
+    return heatmap_collection
+
+
+def get_history_collection():
+    if health.available is False:
+        return None
+    return history_collection
+
+
+def database_unavailable(error: Exception) -> HTTPException:
+    # No reachable server: fail the following requests fast until the health check sees it again.
+    if isinstance(error, ServerSelectionTimeoutError):
+        health.mark(False, error=str(error))
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error))
+
+
+async def ping(timeout: float = HEALTH_CHECK_TIMEOUT) -> bool:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout)
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        # A server that was down at startup comes back without indexes; serving before they exist would let
+        # $geoNear fail and duplicate reviews slip past the missing unique key.
+        if not health.initialized:
+            await initialize()
+    except (asyncio.TimeoutError, PyMongoError) as e:
+        health.mark(False, error=str(e) or "Database ping timed out.")
+        return False
+    health.mark(True, latency_ms=latency_ms)
+    return True
+
+
+async def ensure_indexes():
+    await categories_collection.create_indexes(CATEGORIES_INDEXES)
+    await history_collection.create_indexes(HISTORY_INDEXES)
+    existing = await reviews_collection.index_information()
+    for name in OBSOLETE_REVIEWS_INDEXES:
+        if name in existing:
+            await reviews_collection.drop_index(name)
+    await reviews_collection.create_indexes(REVIEWS_INDEXES)
+    try:
+        await reviews_collection.create_indexes([REVIEW_KEY_INDEX])
+    except OperationFailure as e:
+        # Existing duplicates block the unique index; the app keeps working and `manage dedupe` clears them.
+        logger.warning("Unique review key index not created, run `python -m app.manage dedupe`: %s", e)
+
+
+async def initialize():
+    await ensure_indexes()
+    await category_registry.load()
+    health.initialized = True
+
+
+async def warm_up():
+    # Concurrent pings force the pool to open minPoolSize connections before the first request needs them.
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(max(1, CLIENT_OPTIONS["minPoolSize"]))))
+
+
+async def monitor_health():
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        await ping()
+
+
+async def connect():
+    global _health_task
+    try:
+        await warm_up()
+        await initialize()
+        health.mark(True)
+    except PyMongoError as e:
+        logger.warning("MongoDB is not available at startup: %s", e)
+        health.mark(False, error=str(e))
+    _health_task = asyncio.create_task(monitor_health())
+
+
+async def disconnect():
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        _health_task = None
+    client.close()
@@ -1,13 +1,72 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, Response
+from fastapi.middleware.gzip import GZipMiddleware
+
+from app import database
 from app.routes.exploration_recommender_router import recommender_router
+from app.routes.heatmap_router import heatmap_router
+from app.routes.review_history_router import history_router
 from app.routes.review_locations_router import review_router
+from app.utils.enums import StatusEnum
+from app.utils.metrics import MetricsMiddleware, pool_stats, render_metrics
+from app.utils.responses import FastJSONResponse
+from app.utils.write_behind import WRITE_BEHIND_ENABLED, start_queues, stop_queues
+
+# Small bodies fit in a packet either way; compressing them only costs CPU.
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "5"))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await database.connect()
+    if WRITE_BEHIND_ENABLED:
+        start_queues()
+    yield
+    # Queued writes are flushed while the client is still open.
+    await stop_queues()
+    await database.disconnect()
+
 
 app = FastAPI(
     title="Exploration Recommender API",
     description="API for exploration recommendations and location reviews.",
     version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.include_router(recommender_router, prefix="/exploration-recommendations", tags=["Exploration Recommender"])
 app.include_router(review_router, prefix="/review", tags=["Review"])
+app.include_router(heatmap_router, prefix="/heatmap", tags=["Heatmap"])
+app.include_router(history_router, prefix="/history", tags=["History"])
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    available = await database.ping()
+    content = {
+        "status": (StatusEnum.SUCCESS if available else StatusEnum.ERROR).value,
+        "data": [
+            {
+                "database": database.health.to_json(),
+                "pool": {
+                    "max_pool_size": database.CLIENT_OPTIONS["maxPoolSize"],
+                    "min_pool_size": database.CLIENT_OPTIONS["minPoolSize"],
+                    "servers": pool_stats(),
+                },
+            }
+        ],
+        "message": "Ready." if available else "Database connection not available.",
+    }
+    return FastJSONResponse(content, status_code=200 if available else 503)
@@ -0,0 +1,452 @@
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.database import (
+    CATEGORIES_INDEXES,
+    OBSOLETE_REVIEWS_INDEXES,
+    REVIEW_KEY_INDEX,
+    categories_collection,
+    ensure_indexes,
+    heatmap_collection,
+    reviews_collection,
+)
+from app.models import COORDINATE_PRECISION, REVIEW_PROJECTION, serialize_review
+from app.routes.review_locations_router import (
+    DUPLICATE_KEY_ERROR,
+    UPSERT_ATTEMPTS,
+    bulk_write_error_detail,
+    validation_error_detail,
+)
+from app.utils import geohash
+from app.utils.categories import category_registry
+from app.utils.heatmap import HEATMAP_PRECISIONS, NEVER, cell_id
+from app.utils.responses import dumps_line
+from app.utils.transfer import CSV_FIELDS, FORMATS, Checkpoint, Row, csv_record, detect_format, iter_rows, parse_row
+
+DEDUPE_BATCH_SIZE = 500
+BACKFILL_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_WORKERS = 4
+IMPORT_MODES = ("upsert", "insert")
+EXPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+
+async def backfill_geo():
+    # Server-side pipeline update, so existing documents are migrated without being pulled into Python.
+    result = await reviews_collection.update_many(
+        {
+            "geo": {"$exists": False},
+            "location.latitude": {"$type": "number"},
+            "location.longitude": {"$type": "number"},
+        },
+        [{"$set": {"geo": {"type": "Point", "coordinates": ["$location.longitude", "$location.latitude"]}}}],
+    )
+    await ensure_indexes()
+    print(f"Backfilled GeoJSON points on {result.modified_count} reviews.")
+
+
+async def normalize_keys():
+    # Same rounding as the API models, so old documents line up with the unique review key.
+    rounded = {axis: {"$round": [f"$location.{axis}", COORDINATE_PRECISION]} for axis in ("latitude", "longitude")}
+    result = await reviews_collection.update_many(
+        {"location.latitude": {"$type": "number"}, "location.longitude": {"$type": "number"}},
+        [
+            {
+                "$set": {
+                    "location.latitude": rounded["latitude"],
+                    "location.longitude": rounded["longitude"],
+                    "geo": {"type": "Point", "coordinates": [rounded["longitude"], rounded["latitude"]]},
+                }
+            }
+        ],
+    )
+    return result.modified_count
+
+
+async def move_categories_to_ids():
+    # Key indexes are rebuilt afterwards: a migrated review may collide with one already stored by ID.
+    indexes = await reviews_collection.index_information()
+    for index in (*OBSOLETE_REVIEWS_INDEXES, REVIEW_KEY_INDEX.document["name"]):
+        if index in indexes:
+            await reviews_collection.drop_index(index)
+    await categories_collection.create_indexes(CATEGORIES_INDEXES)
+    await category_registry.load()
+    # One server-side update per distinct name replaces the embedded ``category`` with its ID.
+    legacy = {"category.name": {"$type": "string"}, "category_id": {"$exists": False}}
+    migrated = 0
+    for name in await reviews_collection.distinct("category.name", legacy):
+        category_id = await category_registry.get_id(name.strip())
+        result = await reviews_collection.update_many(
+            {**legacy, "category.name": name}, {"$set": {"category_id": category_id}, "$unset": {"category": ""}}
+        )
+        migrated += result.modified_count
+    return migrated
+
+
+async def migrate_categories():
+    migrated = await move_categories_to_ids()
+    await ensure_indexes()
+    print(f"Moved {migrated} reviews to {len(category_registry)} category IDs.")
+
+
+async def dedupe():
+    normalized = await normalize_keys()
+    migrated = await move_categories_to_ids()
+    # Keep the oldest document of each key, carrying over the most recent review date of its duplicates.
+    groups = reviews_collection.aggregate(
+        [
+            {"$sort": {"_id": 1}},
+            {
+                "$group": {
+                    "_id": {"lat": "$location.latitude", "lng": "$location.longitude", "cat": "$category_id"},
+                    "ids": {"$push": "$_id"},
+                    "last_reviewed": {"$max": "$last_reviewed"},
+                }
+            },
+            {"$match": {"ids.1": {"$exists": True}}},
+        ],
+        allowDiskUse=True,
+    )
+    operations, duplicates = [], 0
+    async for group in groups:
+        keep, *remove = group["ids"]
+        if group["last_reviewed"] is not None:
+            operations.append(UpdateOne({"_id": keep}, {"$set": {"last_reviewed": group["last_reviewed"]}}))
+        operations.append(DeleteMany({"_id": {"$in": remove}}))
+        duplicates += len(remove)
+        if len(operations) >= DEDUPE_BATCH_SIZE:
+            await reviews_collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await reviews_collection.bulk_write(operations, ordered=False)
+    await ensure_indexes()
+    print(f"Normalized {normalized} reviews, moved {migrated} to category IDs and removed {duplicates} duplicates.")
+    await rebuild_heatmap()
+
+
+async def backfill_geohash() -> int:
+    # Geohashes can't be computed by an update pipeline, so missing ones are filled from Python in batches.
+    operations, backfilled = [], 0
+    missing = reviews_collection.find(
+        {
+            "geohash": {"$exists": False},
+            "location.latitude": {"$type": "number"},
+            "location.longitude": {"$type": "number"},
+        },
+        {"location": 1},
+        batch_size=BACKFILL_BATCH_SIZE,
+    )
+    async for review in missing:
+        location = review["location"]
+        operations.append(
+            UpdateOne(
+                {"_id": review["_id"]},
+                {"$set": {"geohash": geohash.encode(location["latitude"], location["longitude"])}},
+            )
+        )
+        if len(operations) >= BACKFILL_BATCH_SIZE:
+            backfilled += (await reviews_collection.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        backfilled += (await reviews_collection.bulk_write(operations, ordered=False)).modified_count
+    return backfilled
+
+
+def heatmap_cells_pipeline(precision: int, into: str) -> List[dict]:
+    """Fold reviews into finished cell documents and ``$merge`` them into ``into``, all on the server."""
+    never = {"$eq": ["$_id.day", None]}
+    return [
+        {"$match": {"geohash": {"$type": "string"}}},
+        {
+            "$group": {
+                "_id": {
+                    "cell": {"$substrBytes": ["$geohash", 0, precision]},
+                    "day": {"$dateToString": {"format": "%Y%m%d", "date": "$last_reviewed"}},
+                },
+                "count": {"$sum": 1},
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.cell",
+                NEVER: {"$sum": {"$cond": [never, "$count", 0]}},
+                "days": {"$push": {"$cond": [never, None, {"k": "$_id.day", "v": "$count"}]}},
+            }
+        },
+        {
+            "$project": {
+                "_id": {"$concat": [cell_id(precision, ""), "$_id"]},
+                "precision": {"$literal": precision},
+                "cell": "$_id",
+                NEVER: 1,
+                "days": {"$arrayToObject": {"$filter": {"input": "$days", "cond": {"$ne": ["$$this", None]}}}},
+            }
+        },
+        {"$merge": {"into": into, "whenMatched": "fail", "whenNotMatched": "insert"}},
+    ]
+
+
+async def rebuild_heatmap():
+    """Recompute every heatmap cell from the reviews.
+
+    Increments the API applies to the live cells while the rebuild runs are lost when the rebuilt cells are
+    swapped in, so run it while review writes are stopped, or run it again once they are quiet.
+    """
+    backfilled = await backfill_geohash()
+    # Built aside and swapped in with a rename, so readers never see a half-built heatmap. The cells are
+    # written by $merge on the server, so memory here doesn't grow with their number.
+    staging = heatmap_collection.database[f"{heatmap_collection.name}_rebuild"]
+    await staging.drop()
+    for precision in HEATMAP_PRECISIONS:
+        await reviews_collection.aggregate(heatmap_cells_pipeline(precision, staging.name), allowDiskUse=True).to_list(
+            length=None
+        )
+    cells = await staging.count_documents({})
+    if cells:
+        await staging.rename(heatmap_collection.name, dropTarget=True)
+    else:
+        await heatmap_collection.drop()
+    print(f"Backfilled {backfilled} geohashes and rebuilt {cells} heatmap cells at precisions {HEATMAP_PRECISIONS}.")
+
+
+def read_chunks(path: str, format: str, chunk_size: int, skip: int) -> Iterator[Tuple[int, List[Row]]]:
+    """Yield ``(first row number, rows)`` chunks of a CSV/NDJSON file, after skipping ``skip`` rows."""
+    with open(path, newline="", encoding="utf-8") as stream:
+        rows = iter_rows(stream, format)
+        for _ in islice(rows, skip):
+            pass
+        first_row = skip
+        while chunk := list(islice(rows, chunk_size)):
+            yield first_row, chunk
+            first_row += len(chunk)
+
+
+def validate_chunk(rows: List[Row], first_row: int):
+    """Split a chunk into ``(review, last_reviewed, row number)`` entries and ``{"row", "detail"}`` errors."""
+    entries, errors = [], []
+    for row, (payload, error) in enumerate(rows, start=first_row):
+        if error is None and not isinstance(payload, dict):
+            error = "Each row must be a JSON object."
+        if error is None:
+            try:
+                entries.append((*parse_row(payload), row))
+                continue
+            except ValidationError as e:
+                error = validation_error_detail(e)
+        errors.append({"row": row, "detail": error})
+    return entries, errors
+
+
+async def write_chunk(collection, entries: list, mode: str, errors: List[dict]) -> dict:
+    """Write validated rows with one unordered batch; rows whose key already exists count as ``existing``.
+
+    ``insert`` skips existing keys. ``upsert`` also moves their ``last_reviewed`` forward to the imported one.
+    Both are idempotent, so a chunk written twice after a resume leaves the collection unchanged.
+    """
+    documents, operations = [], []
+    for review, last_reviewed, _ in entries:
+        category_id = await category_registry.get_id(review.category.name)
+        document = review.to_document(category_id)
+        if mode == "insert":
+            if last_reviewed is not None:
+                document["last_reviewed"] = last_reviewed
+            documents.append(document)
+        else:
+            update = {"$setOnInsert": document}
+            if last_reviewed is not None:
+                update["$max"] = {"last_reviewed": last_reviewed}
+            operations.append(UpdateOne(review.review_key(category_id), update, upsert=True))
+    rows = [row for _, _, row in entries]
+    inserted = existing = 0
+    for attempt in range(UPSERT_ATTEMPTS):
+        if not rows:
+            break
+        try:
+            if mode == "insert":
+                inserted += len((await collection.insert_many(documents, ordered=False)).inserted_ids)
+            else:
+                result = await collection.bulk_write(operations, ordered=False)
+                inserted, existing = inserted + result.upserted_count, existing + result.matched_count
+            break
+        except BulkWriteError as e:
+            inserted += e.details.get("nInserted", 0) + e.details.get("nUpserted", 0)
+            existing += e.details.get("nMatched", 0)
+            retried_operations, retried_rows = [], []
+            for error in e.details["writeErrors"]:
+                index = error["index"]
+                if error.get("code") == DUPLICATE_KEY_ERROR and mode == "insert":
+                    existing += 1
+                elif error.get("code") == DUPLICATE_KEY_ERROR and attempt < UPSERT_ATTEMPTS - 1:
+                    # Another worker upserted the same key first; the retry matches its review instead.
+                    retried_operations.append(operations[index])
+                    retried_rows.append(rows[index])
+                else:
+                    errors.append({"row": rows[index], "detail": bulk_write_error_detail(error)})
+            operations, rows = retried_operations, retried_rows
+    return {"inserted": inserted, "existing": existing}
+
+
+async def import_reviews(
+    path: str,
+    format: Optional[str] = None,
+    mode: str = "upsert",
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    workers: int = IMPORT_WORKERS,
+    checkpoint: Optional[str] = None,
+    skip_heatmap: bool = False,
+    collection=reviews_collection,
+):
+    format = detect_format(path, format)
+    progress = Checkpoint(checkpoint, os.path.abspath(path)).load()
+    if progress.rows:
+        print(f"Resuming {path} after row {progress.rows}.")
+    await category_registry.load()
+    chunks = read_chunks(path, format, chunk_size, progress.rows)
+    # At most ``workers`` chunks wait in the queue and one more per worker is being written: bounded memory.
+    queue: asyncio.Queue = asyncio.Queue(workers)
+    reported = 0
+
+    async def produce():
+        # Reading and parsing the file happens in a thread, overlapping the workers' round trips.
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            await queue.put(chunk)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def work():
+        nonlocal reported
+        while (chunk := await queue.get()) is not None:
+            first_row, rows = chunk
+            entries, errors = validate_chunk(rows, first_row)
+            counts = await write_chunk(collection, entries, mode, errors)
+            for error in errors[: max(0, MAX_REPORTED_ERRORS - reported)]:
+                print(f"Row {error['row']}: {error['detail']}", file=sys.stderr)
+            reported += len(errors)
+            progress.finish(first_row, len(rows), {**counts, "errors": len(errors)})
+
+    tasks = [asyncio.create_task(produce()), *(asyncio.create_task(work()) for _ in range(workers))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    counts = progress.counts
+    print(
+        f"Imported {progress.rows} rows from {path}: {counts['inserted']} inserted, {counts['existing']} existing, "
+        f"{counts['errors']} rejected."
+    )
+    if skip_heatmap:
+        print("Heatmap not rebuilt, run `python -m app.manage rebuild-heatmap`.")
+    else:
+        await rebuild_heatmap()
+
+
+async def export_reviews(
+    path: str,
+    format: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    category: Optional[str] = None,
+    collection=reviews_collection,
+):
+    format = format or ("ndjson" if path == "-" else detect_format(path))
+    await category_registry.load()
+    query = {}
+    if category is not None:
+        category_id = await category_registry.find_id(category.strip())
+        if category_id is None:
+            print(f"Category {category!r} does not exist.", file=sys.stderr)
+            return
+        query = {"category_id": category_id}
+
+    output = sys.stdout.buffer if path == "-" else open(path, "wb")
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    if format == "csv":
+        writer.writerow(CSV_FIELDS)
+
+    async def write(batch: List[dict]):
+        await category_registry.load_reviews(batch)
+        if format == "csv":
+            writer.writerows(csv_record(review) for review in batch)
+        else:
+            output.write(b"".join(dumps_line(serialize_review(review)) for review in batch))
+
+    exported, batch = 0, []
+    try:
+        # ``batch_size`` is both the cursor's getMore size and how many rows are written at a time.
+        async for review in collection.find(query, REVIEW_PROJECTION, batch_size=batch_size):
+            batch.append(review)
+            if len(batch) >= batch_size:
+                await write(batch)
+                exported += len(batch)
+                batch = []
+        if batch:
+            await write(batch)
+            exported += len(batch)
+    finally:
+        text.detach()
+        if output is not sys.stdout.buffer:
+            output.close()
+        else:
+            output.flush()
+    print(f"Exported {exported} reviews to {path}.", file=sys.stderr)
+
+
+COMMANDS = {
+    "backfill-geo": backfill_geo,
+    "dedupe": dedupe,
+    "export": export_reviews,
+    "import": import_reviews,
+    "migrate-categories": migrate_categories,
+    "rebuild-heatmap": rebuild_heatmap,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="Map My World maintenance commands.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("backfill-geo", help="Add the GeoJSON point to reviews that predate it.")
+    subparsers.add_parser("dedupe", help="Merge reviews sharing a location and category, then add the unique index.")
+    subparsers.add_parser("migrate-categories", help="Replace embedded category names with category IDs.")
+    subparsers.add_parser("rebuild-heatmap", help="Backfill review geohashes and recompute the heatmap cells.")
+
+    importer = subparsers.add_parser("import", help="Load reviews from a CSV or NDJSON file.")
+    importer.add_argument("path", help="CSV with latitude,longitude,category[,last_reviewed] columns, or NDJSON.")
+    importer.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+    importer.add_argument(
+        "--mode",
+        choices=IMPORT_MODES,
+        default="upsert",
+        help="upsert also moves last_reviewed of existing reviews forward; insert leaves them untouched.",
+    )
+    importer.add_argument(
+        "--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows validated and written at once."
+    )
+    importer.add_argument("--workers", type=int, default=IMPORT_WORKERS, help="Chunks written concurrently.")
+    importer.add_argument("--checkpoint", help="Progress file; an interrupted import resumes from it.")
+    importer.add_argument("--skip-heatmap", action="store_true", help="Don't rebuild the heatmap afterwards.")
+
+    exporter = subparsers.add_parser("export", help="Dump reviews to a CSV or NDJSON file.")
+    exporter.add_argument("path", help="Output file, or - for NDJSON on stdout.")
+    exporter.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+    exporter.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Cursor batch size.")
+    exporter.add_argument("--category", help="Only export reviews of this category.")
+
+    args = vars(parser.parse_args(argv))
+    asyncio.run(COMMANDS[args.pop("command")](**args))
+
+
+if __name__ == "__main__":
+    main()
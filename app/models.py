@@ -1,12 +1,21 @@
-from datetime import datetime
-from typing import Annotated, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Generic, List, TypeVar
 
-from pydantic import BaseModel, BeforeValidator, Field
+from pydantic import BaseModel, BeforeValidator, Field, field_validator
 from typing_extensions import Optional
 
+from app.utils.categories import category_registry
 from app.utils.enums import StatusEnum
+from app.utils.geohash import encode as geohash_encode
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
+T = TypeVar("T")
+
+REVIEW_PROJECTION = {"location": 1, "category_id": 1, "category": 1, "last_reviewed": 1}
+# Six decimal places is ~11 cm, well below GPS noise, so near-identical submissions share one review key.
+COORDINATE_PRECISION = 6
+# How far ahead of the server clock a device may report a review; later dates would hide the pair for good.
+MAX_CLOCK_SKEW = timedelta(minutes=5)
 
 
 class Location(BaseModel):
@@ -23,12 +32,23 @@ class Location(BaseModel):
         }
     }
 
+    @field_validator("latitude", "longitude")
+    @classmethod
+    def round_coordinate(cls, value: float) -> float:
+        return round(value, COORDINATE_PRECISION)
+
     def to_json(self):
         return {"latitude": self.latitude, "longitude": self.longitude}
 
+    def to_geojson(self):
+        return {"type": "Point", "coordinates": [self.longitude, self.latitude]}
+
+    def to_geohash(self):
+        return geohash_encode(self.latitude, self.longitude)
+
 
 class Category(BaseModel):
-    name: str = Field(..., title="Category name", description="The name of the category")
+    name: str = Field(..., title="Category name", description="The name of the category", min_length=1)
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -39,6 +59,11 @@ class Category(BaseModel):
         }
     }
 
+    @field_validator("name", mode="before")
+    @classmethod
+    def strip_name(cls, value):
+        return value.strip() if isinstance(value, str) else value
+
     def to_json(self):
         return {"name": self.name}
 
@@ -66,6 +91,23 @@ class LocationCategoryReviewCreate(BaseModel):
     def to_json(self):
         return {"location": self.location.to_json(), "category": self.category.to_json()}
 
+    def to_document(self, category_id: int):
+        """Stored shape: the category is referenced by its ``categories`` ID instead of embedding its name."""
+        return {
+            "location": self.location.to_json(),
+            "category_id": category_id,
+            "geo": self.location.to_geojson(),
+            "geohash": self.location.to_geohash(),
+        }
+
+    def review_key(self, category_id: int):
+        """Filter matching the unique ``(latitude, longitude, category)`` key of this review."""
+        return {
+            "location.latitude": self.location.latitude,
+            "location.longitude": self.location.longitude,
+            "category_id": category_id,
+        }
+
 
 class LocationCategoryReview(LocationCategoryReviewCreate):
     id: Optional[PyObjectId] = Field(
@@ -84,12 +126,117 @@ class LocationCategoryReview(LocationCategoryReviewCreate):
         }
 
 
-class ResponseGeneral(BaseModel):
+def serialize_review(review: dict) -> dict:
+    """Project a review document straight into the ``LocationCategoryReview`` JSON shape without validation.
+
+    Category IDs are resolved from the in-memory registry, so referenced IDs must have been loaded with
+    ``category_registry.load_reviews`` first. Documents that still embed ``category`` are served as they are.
+    """
+    location = review["location"]
+    category_id = review.get("category_id")
+    return {
+        "_id": str(review["_id"]),
+        "location": {"latitude": location["latitude"], "longitude": location["longitude"]},
+        "category": {
+            "name": category_registry.name(category_id) if category_id is not None else review["category"]["name"]
+        },
+        "last_reviewed": review.get("last_reviewed"),
+    }
+
+
+async def serialize_reviews(reviews: List[dict]) -> List[dict]:
+    await category_registry.load_reviews(reviews)
+    return [serialize_review(review) for review in reviews]
+
+
+class HeatmapCell(BaseModel):
+    cell: str = Field(..., title="Cell", description="The geohash of the cell")
+    bounds: List[float] = Field(
+        ..., title="Bounds", description="The cell as [min_lon, min_lat, max_lon, max_lat]", min_length=4, max_length=4
+    )
+    never: int = Field(..., title="Never", description="Pairs that were never reviewed")
+    stale: int = Field(..., title="Stale", description="Pairs whose last review is older than the expiration")
+    fresh: int = Field(..., title="Fresh", description="Pairs reviewed recently")
+
+
+class MonthlyReviews(BaseModel):
+    month: datetime = Field(..., title="Month", description="The first instant of the month")
+    reviews: int = Field(..., title="Reviews", description="Reviews recorded during the month")
+
+
+class ReviewFrequency(BaseModel):
+    reviews: int = Field(..., title="Reviews", description="Reviews recorded in the window")
+    first_reviewed: Optional[datetime] = Field(None, title="First Reviewed", description="The earliest review")
+    last_reviewed: Optional[datetime] = Field(None, title="Last Reviewed", description="The latest review")
+    reviews_per_month: float = Field(..., title="Reviews Per Month", description="Average reviews per month")
+    average_interval_days: Optional[float] = Field(
+        None, title="Average Interval Days", description="Average days between consecutive reviews of a pair"
+    )
+
+
+class ReviewHistory(ReviewFrequency):
+    id: PyObjectId = Field(..., alias="_id", title="ID", description="The ID of the location category review")
+    months: List[MonthlyReviews] = Field(..., title="Months", description="Reviews per month with any review")
+
+
+class CategoryReviewHistory(ReviewFrequency):
+    category: Category = Field(..., title="Category", description="The reviewed category")
+    pairs: int = Field(..., title="Pairs", description="Location category pairs reviewed in the window")
+
+
+class ReviewUpdate(BaseModel):
+    location_id: str = Field(..., title="Location ID", description="The ID of the location category review")
+    reviewed_at: Optional[datetime] = Field(
+        None, title="Reviewed At", description="When the review happened, defaults to the time of the request"
+    )
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "location_id": "60f71876f0656d240846c124",
+                    "reviewed_at": "2024-11-05T15:30:00Z",
+                }
+            ]
+        }
+    }
+
+    @field_validator("reviewed_at")
+    @classmethod
+    def not_in_future(cls, value: Optional[datetime]) -> Optional[datetime]:
+        if value is None:
+            return value
+        # Dates without an offset are UTC, as MongoDB stores them.
+        value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        if value > datetime.now(timezone.utc) + MAX_CLOCK_SKEW:
+            raise ValueError("reviewed_at can't be in the future.")
+        return value
+
+
+class ResponseGeneral(BaseModel, Generic[T]):
     status: StatusEnum = Field(..., title="Status", description="The response status")
-    data: Optional[List[Any]] = Field(None, title="Data", description="The response data")
+    data: Optional[List[T]] = Field(None, title="Data", description="The response data")
     message: str = Field(..., title="Message", description="The response message")
     model_config = {
         "json_schema_extra": {
             "examples": [{"status": "Success", "data": [], "message": "Request processed successfully"}]
         }
     }
+
+
+class ResponsePage(ResponseGeneral[T], Generic[T]):
+    next_cursor: Optional[str] = Field(
+        None, title="Next Cursor", description="Pass as `cursor` to fetch the next page, null on the last page"
+    )
+
+
+class ResponseClaim(ResponseGeneral[T], Generic[T]):
+    claimed_until: Optional[datetime] = Field(
+        None, title="Claimed Until", description="When the lease on the claimed recommendations expires"
+    )
+
+
+class ResponseHeatmap(ResponseGeneral[T], Generic[T]):
+    precision: int = Field(..., title="Precision", description="The geohash length of the cells")
+    materialized: bool = Field(
+        ..., title="Materialized", description="Whether the counts were read from the precomputed cells"
+    )
@@ -1,50 +1,495 @@
 from datetime import datetime, timedelta, timezone
+from typing import Any, List, NamedTuple, Optional, Tuple
 
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
 
-from app.database import get_reviews_collection
-from app.models import LocationCategoryReview, ResponseGeneral
+from app.database import (
+    DATABASE_ERRORS,
+    database_unavailable,
+    get_heatmap_collection,
+    get_history_collection,
+    get_reviews_collection,
+)
+from app.models import (
+    REVIEW_PROJECTION,
+    Location,
+    LocationCategoryReview,
+    ResponseClaim,
+    ResponseGeneral,
+    ResponsePage,
+    ReviewUpdate,
+    serialize_review,
+    serialize_reviews,
+)
+from app.utils.cache import recommendations_cache
+from app.utils.categories import category_registry
 from app.utils.enums import StatusEnum
+from app.utils.etag import etag_matches, make_etag
+from app.utils.heatmap import apply_changes
+from app.utils.history import record_reviews
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.responses import dumps_line, success_response
+from app.utils.streaming import NDJSON_MEDIA_TYPE
+from app.utils.write_behind import WriteBehindQueue, WriteQueueFull, register
 
 recommender_router = APIRouter()
 
+RECOMMENDATIONS_LIMIT = 10
+MAX_PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 1000
+REVIEW_EXPIRATION = timedelta(days=30)
+RECOMMENDATIONS_SORT = [("last_reviewed", ASCENDING), ("_id", ASCENDING)]
+MAX_NEARBY_RADIUS_M = 50_000
+MAX_BULK_UPDATES = 1000
+MAX_CLAIM_COUNT = 100
+DEFAULT_LEASE = timedelta(minutes=30)
+MAX_LEASE = timedelta(hours=12)
+MAX_CATEGORY_FILTERS = 20
+DEFAULT_PER_CATEGORY = 2
+# Densified bbox edges stay within metres of their parallels instead of bulging as long great-circle arcs.
+BBOX_EDGE_STEP_DEGREES = 1.0
+HEATMAP_PROJECTION = {**REVIEW_PROJECTION, "geohash": 1}
 
-@recommender_router.get("/", response_model=ResponseGeneral, description="Get exploration recommendations.")
-async def exploration_recommendations(reviews_collection=Depends(get_reviews_collection)):
+
+class TooManyCategories(ValueError):
+    def __init__(self):
+        super().__init__(
+            f"Diverse recommendations over more than {MAX_CATEGORY_FILTERS} categories need a category filter."
+        )
+
+
+def stale_reviews_query(now: datetime, after: Optional[Tuple[Optional[datetime], ObjectId]] = None) -> dict:
+    # Never-reviewed pairs store ``last_reviewed: null``, which sorts before any date, so a single
+    # ascending scan of the ``last_reviewed_id`` index yields them first and then the oldest reviews.
+    threshold = now - REVIEW_EXPIRATION
+    if after is None:
+        return {"$or": [{"last_reviewed": None}, {"last_reviewed": {"$lt": threshold}}]}
+
+    # Keyset continuation strictly after ``(last_reviewed, _id)`` in the same ordering.
+    last_reviewed, _id = after
+    if last_reviewed is None:
+        return {"$or": [{"last_reviewed": None, "_id": {"$gt": _id}}, {"last_reviewed": {"$lt": threshold}}]}
+    return {
+        "$or": [
+            {"last_reviewed": last_reviewed, "_id": {"$gt": _id}},
+            {"last_reviewed": {"$gt": last_reviewed, "$lt": threshold}},
+        ]
+    }
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be four comma-separated numbers: min_lon,min_lat,max_lon,max_lat.")
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError("bbox must satisfy -180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90.")
+    if max_lon - min_lon >= 180:
+        raise ValueError("bbox must span less than 180 degrees of longitude.")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def bbox_query(bbox: Tuple[float, float, float, float]) -> dict:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    steps = max(1, int((max_lon - min_lon) / BBOX_EDGE_STEP_DEGREES))
+    south = [[min_lon + (max_lon - min_lon) * step / steps, min_lat] for step in range(steps + 1)]
+    north = [[lon, max_lat] for lon, _ in reversed(south)]
+    ring = south + north + [south[0]]
+    # $geoWithin bounds the scan through ``geo_last_reviewed_id``; the ranges trim the polygon to the exact box.
+    # That index has no (last_reviewed, _id) order, so every stale review in the box is read and top-k sorted.
+    return {
+        "geo": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}},
+        "location.latitude": {"$gte": min_lat, "$lte": max_lat},
+        "location.longitude": {"$gte": min_lon, "$lte": max_lon},
+    }
+
+
+async def category_ids(names: List[str]) -> List[int]:
+    # Unknown names match nothing, and looking them up never creates a category.
+    ids = []
+    for name in dict.fromkeys(name.strip() for name in names):
+        category_id = await category_registry.find_id(name)
+        if category_id is not None:
+            ids.append(category_id)
+    return ids
+
+
+def filtered_query(query: dict, filters: List[dict]) -> dict:
+    return {"$and": [query, *filters]} if filters else query
+
+
+def diverse_pipeline(
+    collection: str, query: dict, category_ids: List[Any], limit: int, per_category: int
+) -> List[dict]:
+    """Stalest ``per_category`` matches of every category, merged and cut to ``limit``.
+
+    Each category is its own ``category_last_reviewed_id`` range read in page order, so a dense category can't
+    crowd the others out before the cap applies.
+    """
+
+    def stalest(category_id) -> List[dict]:
+        return [
+            {"$match": filtered_query(query, [{"category_id": category_id}])},
+            {"$sort": dict(RECOMMENDATIONS_SORT)},
+            {"$limit": min(per_category, limit)},
+            {"$project": REVIEW_PROJECTION},
+        ]
+
+    first, *others = category_ids
+    return [
+        *stalest(first),
+        *({"$unionWith": {"coll": collection, "pipeline": stalest(category_id)}} for category_id in others),
+        {"$sort": dict(RECOMMENDATIONS_SORT)},
+        {"$limit": limit},
+    ]
+
+
+def claimable_reviews_query(now: datetime) -> dict:
+    return {
+        "$and": [
+            stale_reviews_query(now),
+            {"$or": [{"claimed_until": None}, {"claimed_until": {"$lte": now}}]},
+        ]
+    }
+
+
+def mark_reviewed(reviewed_at: datetime) -> dict:
+    # ``$max`` keeps the later date, so a late or out-of-order sync can't make a reviewed pair stale again.
+    # Recording a review also releases any lease held on the pair.
+    return {"$max": {"last_reviewed": reviewed_at}, "$unset": {"claimed_until": "", "claim_token": ""}}
+
+
+def advances(reviewed_at: datetime, last_reviewed: Optional[datetime]) -> bool:
+    """Whether ``mark_reviewed(reviewed_at)`` moves a pair last reviewed at ``last_reviewed``."""
+    if last_reviewed is None:
+        return True
+    # Dates read back from MongoDB are naive UTC.
+    if last_reviewed.tzinfo is None:
+        last_reviewed = last_reviewed.replace(tzinfo=timezone.utc)
+    return reviewed_at > last_reviewed
+
+
+class PendingUpdate(NamedTuple):
+    reviews_collection: Any
+    heatmap_collection: Any
+    history_collection: Any
+    location_id: ObjectId
+    reviewed_at: datetime
+
+
+async def flush_review_updates(items: List[PendingUpdate]) -> List[Optional[dict]]:
+    """Mark queued reviews as reviewed with one read and one ``bulk_write``; missing reviews resolve to ``None``."""
+    first = items[0]
+    reviews_collection, heatmap_collection, history_collection = (
+        first.reviews_collection,
+        first.heatmap_collection,
+        first.history_collection,
+    )
+    # When a review is queued twice in one batch, the last update wins, as it would have done unbatched.
+    updates = {item.location_id: item.reviewed_at for item in items}
+    found = await reviews_collection.find({"_id": {"$in": list(updates)}}, HEATMAP_PROJECTION).to_list(length=None)
+    found = {review["_id"]: review for review in found}
+    if found:
+        await reviews_collection.bulk_write(
+            [UpdateOne({"_id": _id}, mark_reviewed(updates[_id])) for _id in found], ordered=False
+        )
+        recommendations_cache.invalidate()
+        await apply_changes(
+            heatmap_collection,
+            [(review.get("geohash"), review.get("last_reviewed"), updates[_id]) for _id, review in found.items()],
+        )
+    # Every queued review is an event, even when a later one in the batch superseded its ``last_reviewed``.
+    await record_reviews(
+        history_collection,
+        [
+            (item.location_id, found[item.location_id].get("category_id"), item.reviewed_at)
+            for item in items
+            if item.location_id in found
+        ],
+    )
+    return [
+        {**found[item.location_id], "last_reviewed": item.reviewed_at} if item.location_id in found else None
+        for item in items
+    ]
+
+
+update_queue = register(WriteBehindQueue("review_updates", flush_review_updates))
+
+
+async def load_recommendations(reviews_collection, query: dict, limit: int) -> Tuple[List[dict], Optional[str]]:
+    # One extra row tells whether another page exists without a count query.
+    recommendations = await reviews_collection.find(
+        query, REVIEW_PROJECTION, sort=RECOMMENDATIONS_SORT, limit=limit + 1
+    ).to_list(length=limit + 1)
+    next_cursor = encode_cursor(recommendations[limit - 1]) if len(recommendations) > limit else None
+    return await serialize_reviews(recommendations[:limit]), next_cursor
+
+
+async def load_diverse_recommendations(
+    reviews_collection, query: dict, ids: Optional[Tuple[int, ...]], limit: int, per_category: int
+):
+    if ids is None:
+        # Each category is one more $unionWith branch and index seek, and MongoDB rejects pipelines of more than
+        # 1000 stages, so an unfiltered page only spans a bounded number of categories.
+        if len(category_registry) > MAX_CATEGORY_FILTERS:
+            raise TooManyCategories()
+        # A DISTINCT_SCAN of ``category_last_reviewed_id``: one index seek per category, no documents read.
+        ids = tuple(await reviews_collection.distinct("category_id"))
+        if len(ids) > MAX_CATEGORY_FILTERS:
+            raise TooManyCategories()
+    if not ids:
+        return [], None
+    recommendations = await reviews_collection.aggregate(
+        diverse_pipeline(reviews_collection.name, query, list(ids), limit, per_category)
+    ).to_list(length=limit)
+    return await serialize_reviews(recommendations), None
+
+
+def tagged(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
+
+
+async def stream_recommendations(cursor):
+    async for review in cursor:
+        await category_registry.load_reviews((review,))
+        yield dumps_line(serialize_review(review))
+
+
+@recommender_router.get(
+    "/", response_model=ResponsePage[LocationCategoryReview], description="Get exploration recommendations."
+)
+async def exploration_recommendations(
+    limit: int = Query(
+        RECOMMENDATIONS_LIMIT, title="Limit", description="Maximum recommendations per page", ge=1, le=MAX_PAGE_SIZE
+    ),
+    cursor: Optional[str] = Query(None, title="Cursor", description="The next_cursor returned with the previous page"),
+    category: Optional[List[str]] = Query(
+        None,
+        title="Category",
+        description="Only recommend these categories; repeat the parameter for several",
+        max_length=MAX_CATEGORY_FILTERS,
+    ),
+    bbox: Optional[str] = Query(
+        None, title="Bounding Box", description="Only recommend inside min_lon,min_lat,max_lon,max_lat"
+    ),
+    diverse: bool = Query(
+        False, title="Diverse", description="Cap the recommendations per category so no category fills the page"
+    ),
+    per_category: int = Query(
+        DEFAULT_PER_CATEGORY,
+        title="Per Category",
+        description="Maximum recommendations per category in diverse mode",
+        ge=1,
+        le=MAX_PAGE_SIZE,
+    ),
+    accept: Optional[str] = Header(
+        None, description=f"Send {NDJSON_MEDIA_TYPE} to stream every remaining recommendation as NDJSON"
+    ),
+    if_none_match: Optional[str] = Header(
+        None, description="The ETag of a page already held; answered with 304 while the page is unchanged"
+    ),
+    reviews_collection=Depends(get_reviews_collection),
+):
     if reviews_collection is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
         )
+    if diverse and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Diverse recommendations are not paginated."
+        )
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        box = parse_bbox(bbox) if bbox else None
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    stream = bool(accept and NDJSON_MEDIA_TYPE in accept and not diverse)
+    etag = None
+    if not stream:
+        # Read before loading: a write that lands mid-load bumps the version, so this tag can't outlive the page.
+        etag = make_etag(
+            recommendations_cache.version,
+            (limit, cursor, tuple(category or ()), box, diverse, per_category if diverse else None),
+        )
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
     try:
-        date_threshold = datetime.now(timezone.utc) - timedelta(days=30)
+        filters, ids = [], None
+        if category:
+            ids = tuple(sorted(await category_ids(category)))
+            if not ids:
+                return tagged(success_response("No exploration recommendations available.", [], next_cursor=None), etag)
+            filters.append({"category_id": {"$in": list(ids)}})
+        if box:
+            filters.append(bbox_query(box))
+        query = filtered_query(stale_reviews_query(datetime.now(timezone.utc), after), filters)
 
-        never_reviewed = await reviews_collection.find({"last_reviewed": None}).to_list(length=None)
-        older_reviews = await reviews_collection.find({"last_reviewed": {"$lt": date_threshold}}).to_list(length=None)
+        if stream:
+            return StreamingResponse(
+                stream_recommendations(
+                    reviews_collection.find(
+                        query, REVIEW_PROJECTION, sort=RECOMMENDATIONS_SORT, batch_size=STREAM_BATCH_SIZE
+                    )
+                ),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
 
-        if not never_reviewed and not older_reviews:
-            return ResponseGeneral(
-                status=StatusEnum.SUCCESS, message="No exploration recommendations available.", data=[]
+        cache_key = (limit, cursor, ids, box)
+        if diverse:
+            recommendations, next_cursor = await recommendations_cache.get_or_load(
+                (*cache_key, per_category),
+                lambda: load_diverse_recommendations(reviews_collection, query, ids, limit, per_category),
             )
+        else:
+            recommendations, next_cursor = await recommendations_cache.get_or_load(
+                cache_key, lambda: load_recommendations(reviews_collection, query, limit)
+            )
+
+        if not recommendations:
+            return tagged(success_response("No exploration recommendations available.", [], next_cursor=None), etag)
+
+        return tagged(
+            success_response(
+                "Exploration recommendations retrieved successfully.", recommendations, next_cursor=next_cursor
+            ),
+            etag,
+        )
+
+    except TooManyCategories as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@recommender_router.get(
+    "/nearby",
+    response_model=ResponseGeneral[LocationCategoryReview],
+    description="Get the nearest exploration recommendations.",
+)
+async def nearby_exploration_recommendations(
+    lat: float = Query(..., title="Latitude", description="Latitude of the explorer", ge=-90, le=90),
+    lon: float = Query(..., title="Longitude", description="Longitude of the explorer", ge=-180, le=180),
+    radius_m: float = Query(1_000, title="Radius", description="Search radius in meters", gt=0, le=MAX_NEARBY_RADIUS_M),
+    reviews_collection=Depends(get_reviews_collection),
+):
+    if reviews_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    try:
+        pipeline = [
+            {
+                "$geoNear": {
+                    "near": Location(latitude=lat, longitude=lon).to_geojson(),
+                    "key": "geo",
+                    "distanceField": "distance_m",
+                    "maxDistance": radius_m,
+                    "query": stale_reviews_query(datetime.now(timezone.utc)),
+                    "spherical": True,
+                }
+            },
+            {"$limit": RECOMMENDATIONS_LIMIT},
+            {"$project": REVIEW_PROJECTION},
+        ]
+        recommendations = await reviews_collection.aggregate(pipeline).to_list(length=RECOMMENDATIONS_LIMIT)
+
+        if not recommendations:
+            return success_response("No exploration recommendations available nearby.", [])
+
+        return success_response(
+            "Nearby exploration recommendations retrieved successfully.",
+            await serialize_reviews(recommendations),
+        )
+
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@recommender_router.get("/cache", response_model=ResponseGeneral, description="Get the recommendations cache counters.")
+async def recommendations_cache_stats():
+    return ResponseGeneral(
+        status=StatusEnum.SUCCESS,
+        message="Recommendations cache statistics retrieved successfully.",
+        data=[recommendations_cache.stats()],
+    )
+
 
-        recommendations = never_reviewed + older_reviews
-        recommendations = recommendations[:10]
+@recommender_router.post(
+    "/claim",
+    response_model=ResponseClaim[LocationCategoryReview],
+    description="Claim exploration recommendations for a limited time.",
+)
+async def claim_exploration_recommendations(
+    count: int = Query(
+        RECOMMENDATIONS_LIMIT, title="Count", description="Number of recommendations to claim", ge=1, le=MAX_CLAIM_COUNT
+    ),
+    lease_seconds: int = Query(
+        int(DEFAULT_LEASE.total_seconds()),
+        title="Lease",
+        description="Seconds before unreviewed claims become available to other explorers",
+        ge=1,
+        le=int(MAX_LEASE.total_seconds()),
+    ),
+    reviews_collection=Depends(get_reviews_collection),
+):
+    if reviews_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    try:
+        now = datetime.now(timezone.utc)
+        claimed_until = now + timedelta(seconds=lease_seconds)
+        claim_token = ObjectId()
+        claimable = claimable_reviews_query(now)
+        lease = {"claimed_until": claimed_until, "claim_token": claim_token}
+        claimed: List[dict] = []
+
+        # Each find_one_and_update atomically takes the stalest pair nobody holds, so concurrent callers get
+        # disjoint sets and a caller that loses a pair simply moves on to the next one instead of giving up.
+        while len(claimed) < count:
+            review = await reviews_collection.find_one_and_update(
+                claimable,
+                {"$set": lease},
+                projection=REVIEW_PROJECTION,
+                sort=RECOMMENDATIONS_SORT,
+                return_document=ReturnDocument.AFTER,
+            )
+            if review is None:
+                break
+            claimed.append(review)
 
-        recommendations_json = [LocationCategoryReview(**review).to_json() for review in recommendations]
+        if not claimed:
+            return success_response("No exploration recommendations available to claim.", [], claimed_until=None)
 
-        return ResponseGeneral(
-            status=StatusEnum.SUCCESS,
-            message="Exploration recommendations retrieved successfully.",
-            data=recommendations_json,
+        return success_response(
+            "Exploration recommendations claimed successfully.",
+            await serialize_reviews(claimed),
+            claimed_until=claimed_until,
         )
 
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@recommender_router.patch("/", response_model=ResponseGeneral, description="Update review.")
-async def update_review(location_id: str, reviews_collection=Depends(get_reviews_collection)):
+@recommender_router.patch("/", response_model=ResponseGeneral[LocationCategoryReview], description="Update review.")
+async def update_review(
+    location_id: str,
+    reviews_collection=Depends(get_reviews_collection),
+    heatmap_collection=Depends(get_heatmap_collection),
+    history_collection=Depends(get_history_collection),
+):
     if reviews_collection is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
@@ -53,20 +498,102 @@ async def update_review(location_id: str, reviews_collection=Depends(get_reviews
         location_id = ObjectId(location_id)
     except InvalidId as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
-    review = await reviews_collection.find_one({"_id": location_id})
+    try:
+        reviewed_at = datetime.now(timezone.utc)
+        if update_queue.running:
+            review = await update_queue.submit(
+                PendingUpdate(reviews_collection, heatmap_collection, history_collection, location_id, reviewed_at)
+            )
+        else:
+            # The previous ``last_reviewed`` tells which heatmap counter the review moves out of.
+            review = await reviews_collection.find_one_and_update(
+                {"_id": location_id},
+                mark_reviewed(reviewed_at),
+                projection=HEATMAP_PROJECTION,
+                return_document=ReturnDocument.BEFORE,
+            )
+            if review is not None:
+                await apply_changes(
+                    heatmap_collection, [(review.get("geohash"), review.get("last_reviewed"), reviewed_at)]
+                )
+                await record_reviews(history_collection, [(location_id, review.get("category_id"), reviewed_at)])
+                review["last_reviewed"] = reviewed_at
+        if review is not None:
+            data = await serialize_reviews([review])
+    except WriteQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     if review is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found.")
-    try:
+    recommendations_cache.invalidate()
+
+    return success_response("Review updated successfully.", data)
+
+
+@recommender_router.patch("/bulk", response_model=ResponseGeneral, description="Update several reviews at once.")
+async def bulk_update_review(
+    reviews: List[ReviewUpdate] = Body(
+        ..., title="Reviews", description="The reviews to mark as reviewed", min_length=1, max_length=MAX_BULK_UPDATES
+    ),
+    reviews_collection=Depends(get_reviews_collection),
+    heatmap_collection=Depends(get_heatmap_collection),
+    history_collection=Depends(get_history_collection),
+):
+    if reviews_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    now = datetime.now(timezone.utc)
+    updates, invalid = {}, []
+    for review in reviews:
+        try:
+            updates[ObjectId(review.location_id)] = review.reviewed_at or now
+        except InvalidId:
+            invalid.append(review.location_id)
 
-        review["last_reviewed"] = datetime.now(timezone.utc)
-        await reviews_collection.update_one({"_id": location_id}, {"$set": review})
+    try:
+        matched, not_found, modified_count = [], [], 0
+        if updates:
+            # One read up front yields both the missing IDs and the previous dates the heatmap moves away from.
+            found = await reviews_collection.find(
+                {"_id": {"$in": list(updates)}}, {"geohash": 1, "last_reviewed": 1, "category_id": 1}
+            ).to_list(length=None)
+            found = {review["_id"]: review for review in found}
+            matched = [_id for _id in updates if _id in found]
+            not_found = [_id for _id in updates if _id not in found]
+        if matched:
+            result = await reviews_collection.bulk_write(
+                [UpdateOne({"_id": _id}, mark_reviewed(updates[_id])) for _id in matched], ordered=False
+            )
+            modified_count = result.modified_count
+            recommendations_cache.invalidate()
+            await apply_changes(
+                heatmap_collection,
+                [
+                    (found[_id].get("geohash"), found[_id].get("last_reviewed"), updates[_id])
+                    for _id in matched
+                    if advances(updates[_id], found[_id].get("last_reviewed"))
+                ],
+            )
+            await record_reviews(
+                history_collection, [(_id, found[_id].get("category_id"), updates[_id]) for _id in matched]
+            )
 
-        return ResponseGeneral(
-            status=StatusEnum.SUCCESS,
-            message="Review updated successfully.",
-            data=[
-                LocationCategoryReview(**review),
+        return success_response(
+            f"{len(matched)} reviews updated successfully.",
+            [
+                {
+                    "matched": [str(_id) for _id in matched],
+                    "modified_count": modified_count,
+                    "not_found": [str(_id) for _id in not_found],
+                    "invalid": invalid,
+                }
             ],
         )
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,134 @@
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+
+from app.database import DATABASE_ERRORS, database_unavailable, get_heatmap_collection, get_reviews_collection
+from app.models import HeatmapCell, ResponseHeatmap
+from app.routes.exploration_recommender_router import REVIEW_EXPIRATION, parse_bbox
+from app.utils import geohash
+from app.utils.heatmap import HEATMAP_PRECISIONS, cell_counts, cell_id
+from app.utils.responses import success_response
+
+heatmap_router = APIRouter()
+
+MAX_HEATMAP_PRECISION = 8
+MAX_HEATMAP_CELLS = 4096
+MAX_TILE_ZOOM = 22
+
+
+def live_heatmap_pipeline(cells: List[str], precision: int, threshold: datetime) -> List[dict]:
+    # Anchored prefixes become ranges on ``geohash_last_reviewed``, and both grouped fields come from that index.
+    last_reviewed = {"$ifNull": ["$last_reviewed", None]}
+    never = {"$eq": [last_reviewed, None]}
+    stale = {"$and": [{"$ne": [last_reviewed, None]}, {"$lt": [last_reviewed, threshold]}]}
+    return [
+        {"$match": {"geohash": {"$in": [re.compile(f"^{cell}") for cell in cells]}}},
+        {"$project": {"_id": 0, "geohash": 1, "last_reviewed": 1}},
+        {
+            "$group": {
+                "_id": {"$substrBytes": ["$geohash", 0, precision]},
+                "never": {"$sum": {"$cond": [never, 1, 0]}},
+                "stale": {"$sum": {"$cond": [stale, 1, 0]}},
+                "total": {"$sum": 1},
+            }
+        },
+    ]
+
+
+async def heatmap_cells(
+    reviews_collection, heatmap_collection, box: Tuple[float, float, float, float], precision: int
+) -> Tuple[List[dict], bool]:
+    """Non-empty cells at ``precision`` intersecting ``box`` and whether they came from the materialized cells."""
+    threshold = datetime.now(timezone.utc) - REVIEW_EXPIRATION
+    cells = geohash.covering_cells(box, precision)
+    materialized = precision in HEATMAP_PRECISIONS
+    if materialized:
+        documents = await heatmap_collection.find(
+            {"_id": {"$in": [cell_id(precision, cell) for cell in cells]}}
+        ).to_list(length=None)
+        counts = {document["cell"]: cell_counts(document, threshold) for document in documents}
+    else:
+        groups = await reviews_collection.aggregate(live_heatmap_pipeline(cells, precision, threshold)).to_list(
+            length=None
+        )
+        counts = {
+            group["_id"]: {
+                "never": group["never"],
+                "stale": group["stale"],
+                "fresh": group["total"] - group["never"] - group["stale"],
+            }
+            for group in groups
+        }
+    return [
+        {"cell": cell, "bounds": list(geohash.bounds(cell)), **counts[cell]}
+        for cell in cells
+        if cell in counts and any(counts[cell].values())
+    ], materialized
+
+
+async def heatmap_response(reviews_collection, heatmap_collection, box, precision: int):
+    if reviews_collection is None or heatmap_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    if geohash.covering_count(box, precision) > MAX_HEATMAP_CELLS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"The area covers more than {MAX_HEATMAP_CELLS} cells at precision {precision}.",
+        )
+    try:
+        cells, materialized = await heatmap_cells(reviews_collection, heatmap_collection, box, precision)
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    return success_response("Heatmap retrieved successfully.", cells, precision=precision, materialized=materialized)
+
+
+@heatmap_router.get(
+    "/geohash",
+    response_model=ResponseHeatmap[HeatmapCell],
+    description="Count never-reviewed, stale and fresh pairs per geohash cell inside a bounding box.",
+)
+async def geohash_heatmap(
+    bbox: str = Query(..., title="Bounding Box", description="The area as min_lon,min_lat,max_lon,max_lat"),
+    precision: int = Query(
+        5, title="Precision", description="Geohash length of the cells", ge=1, le=MAX_HEATMAP_PRECISION
+    ),
+    reviews_collection=Depends(get_reviews_collection),
+    heatmap_collection=Depends(get_heatmap_collection),
+):
+    try:
+        box = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return await heatmap_response(reviews_collection, heatmap_collection, box, precision)
+
+
+@heatmap_router.get(
+    "/tiles/{z}/{x}/{y}",
+    response_model=ResponseHeatmap[HeatmapCell],
+    description="Count never-reviewed, stale and fresh pairs per geohash cell inside a slippy-map tile.",
+)
+async def tile_heatmap(
+    z: int = Path(..., title="Zoom", ge=0, le=MAX_TILE_ZOOM),
+    x: int = Path(..., title="Tile Column", ge=0),
+    y: int = Path(..., title="Tile Row", ge=0),
+    precision: Optional[int] = Query(
+        None,
+        title="Precision",
+        description="Geohash length of the cells, by default about eight cells across the tile",
+        ge=1,
+        le=MAX_HEATMAP_PRECISION,
+    ),
+    reviews_collection=Depends(get_reviews_collection),
+    heatmap_collection=Depends(get_heatmap_collection),
+):
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Tile {z}/{x}/{y} does not exist."
+        )
+    precision = precision or min(geohash.precision_for_tile(z), MAX_HEATMAP_PRECISION)
+    return await heatmap_response(reviews_collection, heatmap_collection, geohash.tile_bounds(z, x, y), precision)
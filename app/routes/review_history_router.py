@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+
+from app.database import DATABASE_ERRORS, database_unavailable, get_history_collection, get_reviews_collection
+from app.models import CategoryReviewHistory, ResponseGeneral, ReviewHistory
+from app.utils.categories import category_registry
+from app.utils.history import average_interval_days, months_back
+from app.utils.responses import success_response
+
+history_router = APIRouter()
+
+DEFAULT_HISTORY_MONTHS = 12
+MAX_HISTORY_MONTHS = 120
+BUCKET_PROJECTION = {"_id": 0, "month": 1, "count": 1, "first": 1, "last": 1}
+HISTORY_MONTHS = Query(
+    DEFAULT_HISTORY_MONTHS,
+    title="Months",
+    description="Calendar months to cover, counting the current one",
+    ge=1,
+    le=MAX_HISTORY_MONTHS,
+)
+
+
+def category_history_pipeline(category_id: int, since: datetime) -> list:
+    # Buckets carry their count and first/last timestamps, so no stage needs to unwind the events.
+    return [
+        {"$match": {"category_id": category_id, "month": {"$gte": since}}},
+        {
+            "$group": {
+                "_id": "$review_id",
+                "count": {"$sum": "$count"},
+                "first": {"$min": "$first"},
+                "last": {"$max": "$last"},
+            }
+        },
+        {
+            "$group": {
+                "_id": None,
+                "pairs": {"$sum": 1},
+                "reviews": {"$sum": "$count"},
+                "first": {"$min": "$first"},
+                "last": {"$max": "$last"},
+                "span_ms": {"$sum": {"$subtract": ["$last", "$first"]}},
+                "intervals": {"$sum": {"$subtract": ["$count", 1]}},
+            }
+        },
+    ]
+
+
+@history_router.get(
+    "/reviews/{location_id}",
+    response_model=ResponseGeneral[ReviewHistory],
+    description="Get how often a location category pair was reviewed over the last months.",
+)
+async def review_history(
+    location_id: str = Path(..., title="Location ID", description="The ID of the location category review"),
+    months: int = HISTORY_MONTHS,
+    reviews_collection=Depends(get_reviews_collection),
+    history_collection=Depends(get_history_collection),
+):
+    if reviews_collection is None or history_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    try:
+        location_id = ObjectId(location_id)
+    except InvalidId as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    try:
+        since = months_back(datetime.now(timezone.utc), months)
+        buckets = await history_collection.find(
+            {"review_id": location_id, "month": {"$gte": since}}, BUCKET_PROJECTION, sort=[("month", 1)]
+        ).to_list(length=None)
+        exists = bool(buckets) or await reviews_collection.find_one({"_id": location_id}, {"_id": 1}) is not None
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if not exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found.")
+
+    reviews = sum(bucket["count"] for bucket in buckets)
+    first = last = interval = None
+    if buckets:
+        first, last = buckets[0]["first"], buckets[-1]["last"]
+        interval = average_interval_days(last - first, reviews - 1)
+    return success_response(
+        "Review history retrieved successfully.",
+        [
+            {
+                "_id": str(location_id),
+                "reviews": reviews,
+                "first_reviewed": first,
+                "last_reviewed": last,
+                "reviews_per_month": round(reviews / months, 3),
+                "average_interval_days": interval,
+                "months": [{"month": bucket["month"], "reviews": bucket["count"]} for bucket in buckets],
+            }
+        ],
+    )
+
+
+@history_router.get(
+    "/categories/{name}",
+    response_model=ResponseGeneral[CategoryReviewHistory],
+    description="Get how often the pairs of a category were reviewed over the last months.",
+)
+async def category_history(
+    name: str = Path(..., title="Category", description="The name of the category", min_length=1),
+    months: int = HISTORY_MONTHS,
+    history_collection=Depends(get_history_collection),
+):
+    if history_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    try:
+        category_id = await category_registry.find_id(name.strip())
+        totals = None
+        if category_id is not None:
+            since = months_back(datetime.now(timezone.utc), months)
+            groups = await history_collection.aggregate(category_history_pipeline(category_id, since)).to_list(length=1)
+            totals = groups[0] if groups else None
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if category_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found.")
+
+    totals = totals or {"pairs": 0, "reviews": 0, "first": None, "last": None, "span_ms": 0, "intervals": 0}
+    return success_response(
+        "Category review history retrieved successfully.",
+        [
+            {
+                "category": {"name": name.strip()},
+                "pairs": totals["pairs"],
+                "reviews": totals["reviews"],
+                "first_reviewed": totals["first"],
+                "last_reviewed": totals["last"],
+                "reviews_per_month": round(totals["reviews"] / months, 3),
+                "average_interval_days": average_interval_days(
+                    timedelta(milliseconds=totals["span_ms"]), totals["intervals"]
+                ),
+            }
+        ],
+    )
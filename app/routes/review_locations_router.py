@@ -1,29 +1,281 @@
-from fastapi import APIRouter, Body, HTTPException, status
+from typing import Any, List, NamedTuple
 
-from app.database import reviews_collection
-from app.models import LocationCategoryReview, LocationCategoryReviewCreate, ResponseGeneral
+from bson import ObjectId
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, status
+from pydantic import ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+from app.database import DATABASE_ERRORS, database_unavailable, get_heatmap_collection, get_reviews_collection
+from app.models import (
+    REVIEW_PROJECTION,
+    LocationCategoryReview,
+    LocationCategoryReviewCreate,
+    ResponseGeneral,
+    serialize_review,
+)
+from app.utils.cache import recommendations_cache
+from app.utils.categories import category_registry
 from app.utils.enums import StatusEnum
+from app.utils.heatmap import MISSING, apply_changes
+from app.utils.responses import success_response
+from app.utils.streaming import NDJSON_MEDIA_TYPES, StreamFormatError, iter_json_array, iter_ndjson
+from app.utils.write_behind import WriteBehindQueue, WriteQueueFull, register
 
 review_router = APIRouter()
 
+BULK_BATCH_SIZE = 1000
+UPSERT_ATTEMPTS = 2
+DUPLICATE_KEY_ERROR = 11000
+BULK_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {"type": "array", "items": {"$ref": "#/components/schemas/LocationCategoryReviewCreate"}}
+        },
+        "application/x-ndjson": {"schema": {"type": "string", "description": "One review per line."}},
+    },
+}
+
+
+async def upsert_review(reviews_collection, review: LocationCategoryReviewCreate):
+    """Return the review stored under ``review``'s key, inserting it first if needed, and whether it was created."""
+    category_id = await category_registry.get_id(review.category.name)
+    document = {"_id": ObjectId(), **review.to_document(category_id)}
+    for attempt in range(UPSERT_ATTEMPTS):
+        try:
+            stored = await reviews_collection.find_one_and_update(
+                review.review_key(category_id),
+                {"$setOnInsert": document},
+                projection=REVIEW_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return stored, stored["_id"] == document["_id"]
+        except DuplicateKeyError:
+            # Two concurrent upserts of a new key both try to insert; the loser retries and matches the winner.
+            if attempt == UPSERT_ATTEMPTS - 1:
+                raise
+
+
+class PendingCreate(NamedTuple):
+    reviews_collection: Any
+    heatmap_collection: Any
+    review: LocationCategoryReviewCreate
+
+
+def stored_key(review: dict) -> tuple:
+    return review["location"]["latitude"], review["location"]["longitude"], review["category_id"]
+
+
+async def flush_creates(items: List[PendingCreate]) -> List:
+    """Upsert queued creates with one unordered ``bulk_write`` and resolve each to ``(stored, created)``.
+
+    Every item of a batch comes from the same app, so the first item's collections serve the whole batch.
+    """
+    reviews_collection, heatmap_collection = items[0].reviews_collection, items[0].heatmap_collection
+    keys, documents = [], []
+    for item in items:
+        category_id = await category_registry.get_id(item.review.category.name)
+        keys.append(item.review.review_key(category_id))
+        documents.append({"_id": ObjectId(), **item.review.to_document(category_id)})
+
+    errors = {}
+    try:
+        result = await reviews_collection.bulk_write(
+            [UpdateOne(key, {"$setOnInsert": document}, upsert=True) for key, document in zip(keys, documents)],
+            ordered=False,
+        )
+        upserted = result.upserted_ids
+    except BulkWriteError as e:
+        upserted = {entry["index"]: entry["_id"] for entry in e.details.get("upserted", [])}
+        # A duplicate key means another writer inserted the key first; it is read back like any existing review.
+        errors = {
+            error["index"]: WriteError(error["errmsg"], error["code"], error)
+            for error in e.details["writeErrors"]
+            if error.get("code") != DUPLICATE_KEY_ERROR
+        }
+
+    existing = [index for index in range(len(items)) if index not in upserted and index not in errors]
+    stored = {}
+    if existing:
+        reviews = await reviews_collection.find(
+            {"$or": [keys[index] for index in existing]}, REVIEW_PROJECTION
+        ).to_list(length=None)
+        stored = {stored_key(review): review for review in reviews}
+
+    created = [document for index, document in enumerate(documents) if index in upserted]
+    if created:
+        recommendations_cache.invalidate()
+        await apply_changes(heatmap_collection, [(document["geohash"], MISSING, None) for document in created])
+
+    results = []
+    for index, document in enumerate(documents):
+        if index in errors:
+            results.append(errors[index])
+        elif index in upserted:
+            results.append(
+                ({field: document[field] for field in ("_id", *REVIEW_PROJECTION) if field in document}, True)
+            )
+        elif stored_key(document) in stored:
+            results.append((stored[stored_key(document)], False))
+        else:
+            results.append(LookupError("The existing review could not be read back."))
+    return results
+
 
-@review_router.post("/", response_model=ResponseGeneral, description="Create a location category review.")
+create_queue = register(WriteBehindQueue("review_creates", flush_creates))
+
+
+@review_router.post(
+    "/",
+    response_model=ResponseGeneral[LocationCategoryReview],
+    description="Create a location category review, or return the existing one for the same location and category.",
+)
 async def create_location_with_tag(
     location_category_review: LocationCategoryReviewCreate = Body(
         ..., title="Location Category Review", description="The location and category to be reviewed"
-    )
+    ),
+    reviews_collection=Depends(get_reviews_collection),
+    heatmap_collection=Depends(get_heatmap_collection),
 ):
-    try:
-        result = await reviews_collection.insert_one(location_category_review.to_json())
-        data = await reviews_collection.find_one({"_id": result.inserted_id})
-        return ResponseGeneral(
-            status=StatusEnum.SUCCESS,
-            message="Location category review added successfully",
-            data=[
-                LocationCategoryReview(**data),
-            ],
+    if reviews_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
         )
-    except ConnectionError as e:
+    try:
+        if create_queue.running:
+            data, created = await create_queue.submit(
+                PendingCreate(reviews_collection, heatmap_collection, location_category_review)
+            )
+        else:
+            data, created = await upsert_review(reviews_collection, location_category_review)
+            if created:
+                recommendations_cache.invalidate()
+                await apply_changes(
+                    heatmap_collection, [(location_category_review.location.to_geohash(), MISSING, None)]
+                )
+        if not created:
+            return success_response("Location category review already exists", [serialize_review(data)])
+        return success_response("Location category review added successfully", [serialize_review(data)])
+    except WriteQueueFull as e:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+def validation_error_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'row'}: {item['msg']}" for item in error.errors())
+
+
+def bulk_write_error_detail(error: dict) -> str:
+    if error.get("code") == DUPLICATE_KEY_ERROR:
+        return "A review for this location and category already exists."
+    return error["errmsg"]
+
+
+async def insert_batch(
+    reviews_collection,
+    heatmap_collection,
+    number: int,
+    documents: List[dict],
+    rows: List[int],
+    errors: List[dict],
+):
+    received = len(documents) + len(errors)
+    inserted = 0
+    if documents:
+        failed = set()
+        try:
+            result = await reviews_collection.insert_many(documents, ordered=False)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            failed = {error["index"] for error in e.details["writeErrors"]}
+            errors.extend(
+                {"row": rows[error["index"]], "detail": bulk_write_error_detail(error)}
+                for error in e.details["writeErrors"]
+            )
+        finally:
+            recommendations_cache.invalidate()
+        # Unordered inserts write every document that did not report an error.
+        await apply_changes(
+            heatmap_collection,
+            [(document["geohash"], MISSING, None) for index, document in enumerate(documents) if index not in failed],
+        )
+    return {"batch": number, "received": received, "inserted": inserted, "errors": errors}
+
+
+@review_router.post(
+    "/bulk",
+    response_model=ResponseGeneral,
+    description="Create location category reviews from a JSON array or an NDJSON stream.",
+    openapi_extra={"requestBody": BULK_REQUEST_BODY},
+)
+async def bulk_create_location_with_tag(
+    request: Request,
+    reviews_collection=Depends(get_reviews_collection),
+    heatmap_collection=Depends(get_heatmap_collection),
+):
+    if reviews_collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database connection not available."
+        )
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    parse_rows = iter_ndjson if media_type in NDJSON_MEDIA_TYPES else iter_json_array
+
+    batches: List[dict] = []
+    documents, rows, errors = [], [], []
+    received = 0
+    stream_error = None
+    try:
+        try:
+            async for payload, error in parse_rows(request.stream()):
+                if error is None:
+                    try:
+                        review = LocationCategoryReviewCreate.model_validate(payload)
+                        documents.append(review.to_document(await category_registry.get_id(review.category.name)))
+                        rows.append(received)
+                    except ValidationError as e:
+                        error = validation_error_detail(e)
+                if error is not None:
+                    errors.append({"row": received, "detail": error})
+                received += 1
+                if len(documents) + len(errors) >= BULK_BATCH_SIZE:
+                    batches.append(
+                        await insert_batch(
+                            reviews_collection, heatmap_collection, len(batches), documents, rows, errors
+                        )
+                    )
+                    documents, rows, errors = [], [], []
+        except StreamFormatError as e:
+            stream_error = str(e)
+        # A body that breaks before the first batch was written is rejected whole, without writing its rows.
+        if (documents or errors) and (stream_error is None or batches):
+            batches.append(
+                await insert_batch(reviews_collection, heatmap_collection, len(batches), documents, rows, errors)
+            )
+    except DATABASE_ERRORS as e:
+        raise database_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if stream_error is not None and not batches:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Bulk ingestion stopped at row {received}: {stream_error}",
+        )
+
+    inserted = sum(batch["inserted"] for batch in batches)
+    if stream_error is not None:
+        return ResponseGeneral(
+            status=StatusEnum.ERROR,
+            message=f"Bulk ingestion stopped at row {received} ({inserted} inserted): {stream_error}",
+            data=batches,
+        )
+    return ResponseGeneral(
+        status=StatusEnum.SUCCESS,
+        message=f"Bulk ingestion processed {received} rows ({inserted} inserted).",
+        data=batches,
+    )
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class AsyncTTLCache:
+    """LRU cache with per-entry TTL where concurrent misses on one key share a single load."""
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Bumped by every invalidation, so it also tells callers whether the cached data changed.
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > self._timer():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Shielded so a caller that disconnects does not cancel the load other callers are waiting on.
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        version = self.version
+        try:
+            value = await loader()
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        # A write that landed while loading makes the result stale; hand it to the waiters but don't keep it.
+        if version == self.version and self.ttl > 0 and self.maxsize > 0:
+            self._entries[key] = (self._timer() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+recommendations_cache = AsyncTTLCache(
+    maxsize=int(os.getenv("RECOMMENDATIONS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RECOMMENDATIONS_CACHE_TTL", "5")),
+)
@@ -0,0 +1,92 @@
+import sys
+from typing import Dict, Iterable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+CATEGORY_SEQUENCE = "categories"
+
+
+class CategoryRegistry:
+    """In-process ``name <-> id`` map of the categories collection.
+
+    Category IDs never change and categories are never renamed, so entries stay valid forever: the map is
+    loaded once at startup and written through when a new name is allocated. IDs created by other
+    processes are picked up lazily the first time a review references them.
+    """
+
+    def __init__(self):
+        self.collection = None
+        self.counters = None
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+
+    def bind(self, collection, counters):
+        self.collection = collection
+        self.counters = counters
+
+    def remember(self, category_id: int, name: str) -> str:
+        # Interned, so every cached review and response shares a single string per category.
+        name = sys.intern(name)
+        self._ids[name] = category_id
+        self._names[category_id] = name
+        return name
+
+    def clear(self):
+        self._ids.clear()
+        self._names.clear()
+
+    def __len__(self):
+        return len(self._names)
+
+    def cached_id(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def name(self, category_id: int) -> str:
+        return self._names[category_id]
+
+    async def load(self):
+        async for category in self.collection.find({}, {"name": 1}):
+            self.remember(category["_id"], category["name"])
+
+    async def load_ids(self, category_ids: Iterable[int]):
+        missing = [category_id for category_id in set(category_ids) if category_id not in self._names]
+        if missing:
+            async for category in self.collection.find({"_id": {"$in": missing}}, {"name": 1}):
+                self.remember(category["_id"], category["name"])
+
+    async def load_reviews(self, reviews: Iterable[dict]):
+        """Make sure every ``category_id`` referenced by ``reviews`` can be resolved by :meth:`name`."""
+        await self.load_ids(review["category_id"] for review in reviews if "category_id" in review)
+
+    async def find_id(self, name: str) -> Optional[int]:
+        """ID of an existing category, without creating it."""
+        if name in self._ids:
+            return self._ids[name]
+        category = await self.collection.find_one({"name": name}, {"_id": 1})
+        if category is None:
+            return None
+        self.remember(category["_id"], name)
+        return category["_id"]
+
+    async def get_id(self, name: str) -> int:
+        """ID of the category called ``name``, allocating a new one the first time the name is seen."""
+        existing_id = await self.find_id(name)
+        if existing_id is not None:
+            return existing_id
+        sequence = await self.counters.find_one_and_update(
+            {"_id": CATEGORY_SEQUENCE}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        # An upsert returning the document after the update always finds or creates the counter.
+        assert sequence is not None
+        category_id: int = sequence["seq"]
+        try:
+            await self.collection.insert_one({"_id": category_id, "name": name})
+        except DuplicateKeyError:
+            # Another process created the same name first; the allocated ID is simply left unused.
+            category_id = (await self.collection.find_one({"name": name}, {"_id": 1}))["_id"]
+        self.remember(category_id, name)
+        return category_id
+
+
+category_registry = CategoryRegistry()
@@ -0,0 +1,31 @@
+import hashlib
+import os
+import secrets
+import time
+from typing import Hashable, Optional
+
+# Recommendations also change as reviews age past the expiration, without any write; a tag is only reused
+# within one window of this many seconds. 0 turns conditional GETs off.
+ETAG_WINDOW = float(os.getenv("RECOMMENDATIONS_ETAG_WINDOW", "30"))
+# Versions restart with every process, so tags handed out by another worker or an earlier run never match.
+PROCESS_TAG = secrets.token_hex(8)
+
+
+def make_etag(version: int, key: Hashable, now: Optional[float] = None) -> Optional[str]:
+    """Weak tag of the data behind ``key`` at ``version``, or ``None`` when conditional GETs are off."""
+    if ETAG_WINDOW <= 0:
+        return None
+    window = int((time.time() if now is None else now) // ETAG_WINDOW)
+    digest = hashlib.blake2b(repr((PROCESS_TAG, version, window, key)).encode(), digest_size=12).hexdigest()
+    # Weak, since the gzipped and plain bodies are equivalent but not byte for byte the same.
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: the W/ prefix is ignored on both sides.
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
@@ -0,0 +1,95 @@
+import math
+from typing import List, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_PRECISION = 12
+# Sorts after every BASE32 character, so ``[cell, cell + PREFIX_END)`` is the range of all hashes inside ``cell``.
+PREFIX_END = "~"
+
+Bounds = Tuple[float, float, float, float]
+
+
+def encode(latitude: float, longitude: float, precision: int = MAX_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars: List[str] = []
+    value, bits, even = 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate longitude/latitude, starting with longitude.
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            interval[0] = middle
+        else:
+            value *= 2
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            value, bits = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Width and height in degrees of the cells at ``precision``."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 360.0 / 2**lon_bits, 180.0 / 2**lat_bits
+
+
+def bounds(cell: str) -> Bounds:
+    """``(min_lon, min_lat, max_lon, max_lat)`` of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lon_range[0], lat_range[0], lon_range[1], lat_range[1]
+
+
+def covering_cells(box: Bounds, precision: int) -> List[str]:
+    """Geohash cells at ``precision`` that intersect ``box``, walking the grid one cell at a time."""
+    min_lon, min_lat, max_lon, max_lat = box
+    width, height = cell_size(precision)
+    columns = range(math.floor((min_lon + 180) / width), math.ceil((max_lon + 180) / width))
+    rows = range(math.floor((min_lat + 90) / height), math.ceil((max_lat + 90) / height))
+    return [
+        encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision)
+        for row in rows
+        for column in columns
+    ]
+
+
+def covering_count(box: Bounds, precision: int) -> int:
+    min_lon, min_lat, max_lon, max_lat = box
+    width, height = cell_size(precision)
+    columns = math.ceil((max_lon + 180) / width) - math.floor((min_lon + 180) / width)
+    rows = math.ceil((max_lat + 90) / height) - math.floor((min_lat + 90) / height)
+    return columns * rows
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Bounds:
+    """``(min_lon, min_lat, max_lon, max_lat)`` of a slippy-map (Web Mercator) tile."""
+    tiles = 2**zoom
+
+    def latitude(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / tiles))))
+
+    return x / tiles * 360 - 180, latitude(y + 1), (x + 1) / tiles * 360 - 180, latitude(y)
+
+
+def precision_for_tile(zoom: int, cells_across: int = 8) -> int:
+    """Coarsest precision whose cells split a tile at ``zoom`` into at least ``cells_across`` columns."""
+    tile_width = 360 / 2**zoom
+    for precision in range(1, MAX_PRECISION + 1):
+        if cell_size(precision)[0] * cells_across <= tile_width:
+            return precision
+    return MAX_PRECISION
@@ -0,0 +1,78 @@
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+NEVER = "never"
+# Marks a side of a change where the review does not exist (created or deleted).
+MISSING = object()
+
+# Precisions kept up to date in the ``heatmap_cells`` collection; other precisions are aggregated on demand.
+HEATMAP_PRECISIONS = [int(value) for value in os.getenv("HEATMAP_PRECISIONS", "4,5,6").split(",") if value.strip()]
+
+Change = Tuple[Optional[str], object, object]
+
+
+def day_key(reviewed_at: datetime) -> str:
+    # MongoDB stores UTC, so the day a review moves out of must be the UTC day it was counted under.
+    if reviewed_at.tzinfo is not None:
+        reviewed_at = reviewed_at.astimezone(timezone.utc)
+    return reviewed_at.strftime("%Y%m%d")
+
+
+def bucket(last_reviewed) -> str:
+    """Counter of a cell document that holds a review with this ``last_reviewed``."""
+    return NEVER if last_reviewed is None else f"days.{day_key(last_reviewed)}"
+
+
+def cell_id(precision: int, cell: str) -> str:
+    return f"{precision}:{cell}"
+
+
+def cell_updates(changes: Iterable[Change], precisions: List[int] = HEATMAP_PRECISIONS) -> List[UpdateOne]:
+    """Fold ``(geohash, last_reviewed before, last_reviewed after)`` changes into one ``$inc`` per cell.
+
+    Cells keep a per-day histogram instead of stale/fresh counts, so they stay correct as reviews age
+    without being written again; staleness is decided when the cells are read.
+    """
+    deltas: Dict[Tuple[int, str], Counter] = defaultdict(Counter)
+    for geohash, before, after in changes:
+        if not geohash:
+            continue
+        for precision in precisions:
+            counters = deltas[(precision, geohash[:precision])]
+            if before is not MISSING:
+                counters[bucket(before)] -= 1
+            if after is not MISSING:
+                counters[bucket(after)] += 1
+    updates = []
+    for (precision, cell), counters in deltas.items():
+        increments = {field: delta for field, delta in counters.items() if delta}
+        if increments:
+            updates.append(
+                UpdateOne(
+                    {"_id": cell_id(precision, cell)},
+                    {"$inc": increments, "$setOnInsert": {"precision": precision, "cell": cell}},
+                    upsert=True,
+                )
+            )
+    return updates
+
+
+async def apply_changes(heatmap_collection, changes: Iterable[Change]):
+    updates = cell_updates(changes)
+    if updates:
+        await heatmap_collection.bulk_write(updates, ordered=False)
+
+
+def cell_counts(document: dict, threshold: datetime) -> Dict[str, int]:
+    threshold_day = day_key(threshold)
+    stale = fresh = 0
+    for day, count in document.get("days", {}).items():
+        if day < threshold_day:
+            stale += count
+        else:
+            fresh += count
+    return {"never": document.get(NEVER, 0), "stale": stale, "fresh": fresh}
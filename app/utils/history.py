@@ -0,0 +1,63 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# ``(review ID, category ID, reviewed at)`` of one review event.
+ReviewEvent = Tuple[ObjectId, Optional[int], datetime]
+
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of ``moment``'s month, the key of the bucket that holds it."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def months_back(now: datetime, months: int) -> datetime:
+    """Start of the month ``months - 1`` months before ``now``'s, so the window spans ``months`` buckets."""
+    start = month_start(now)
+    for _ in range(months - 1):
+        start = month_start(start - timedelta(days=1))
+    return start
+
+
+def bucket_updates(events: Iterable[ReviewEvent]) -> List[UpdateOne]:
+    """Append events to one bucket per review and month, folding events of the same bucket into one update.
+
+    Buckets keep their event count and first/last timestamps next to the array, so statistics are computed
+    from a few scalar fields per month instead of unwinding every event.
+    """
+    buckets: Dict[Tuple[ObjectId, datetime], dict] = {}
+    timestamps: Dict[Tuple[ObjectId, datetime], List[datetime]] = defaultdict(list)
+    for review_id, category_id, reviewed_at in events:
+        key = (review_id, month_start(reviewed_at))
+        buckets.setdefault(key, {"category_id": category_id})
+        timestamps[key].append(reviewed_at)
+    return [
+        UpdateOne(
+            {"review_id": review_id, "month": month},
+            {
+                "$push": {"events": {"$each": timestamps[(review_id, month)]}},
+                "$inc": {"count": len(timestamps[(review_id, month)])},
+                "$min": {"first": min(timestamps[(review_id, month)])},
+                "$max": {"last": max(timestamps[(review_id, month)])},
+                "$setOnInsert": bucket,
+            },
+            upsert=True,
+        )
+        for (review_id, month), bucket in buckets.items()
+    ]
+
+
+async def record_reviews(history_collection, events: Iterable[ReviewEvent]):
+    updates = bucket_updates(events)
+    if updates:
+        await history_collection.bulk_write(updates, ordered=False)
+
+
+def average_interval_days(span: timedelta, intervals: int) -> Optional[float]:
+    """Mean time between consecutive reviews, given their summed spans and how many gaps those spans cover."""
+    return round(span / timedelta(days=1) / intervals, 3) if intervals else None
@@ -0,0 +1,234 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from starlette.routing import Match
+
+from app.utils.cache import recommendations_cache
+from app.utils.write_behind import queues
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+
+registry = CollectorRegistry()
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+http_request_mongodb_duration = Histogram(
+    "http_request_mongodb_duration_seconds",
+    "Time spent in MongoDB commands per HTTP request, by route template.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ["method", "route"], registry=registry
+)
+mongodb_command_duration = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command round-trip time.",
+    ["command", "collection"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+mongodb_command_documents = Counter(
+    "mongodb_command_documents",
+    "Documents returned or written by MongoDB commands.",
+    ["command", "collection"],
+    registry=registry,
+)
+mongodb_command_failures = Counter(
+    "mongodb_command_failures", "Failed MongoDB commands.", ["command", "collection"], registry=registry
+)
+mongodb_pool_connections = Gauge(
+    "mongodb_pool_connections", "Open connections in the MongoDB pool.", ["address"], registry=registry
+)
+mongodb_pool_checked_out = Gauge(
+    "mongodb_pool_checked_out", "MongoDB connections currently in use.", ["address"], registry=registry
+)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.mongodb_seconds = 0.0
+
+
+# Motor runs pymongo calls with a copy of the caller's context, so the listener sees the request's timing.
+current_request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_request_timing", default=None)
+
+
+def documents_in_reply(command_name: str, reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if command_name == "findAndModify":
+        return int(reply.get("value") is not None)
+    return int(reply.get("n", 0))
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event) -> str:
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1_000_000
+        mongodb_command_duration.labels(event.command_name, collection).observe(seconds)
+        timing = current_request_timing.get()
+        if timing is not None:
+            timing.mongodb_seconds += seconds
+        return collection
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        mongodb_command_documents.labels(event.command_name, collection).inc(
+            documents_in_reply(event.command_name, event.reply)
+        )
+
+    def failed(self, event):
+        mongodb_command_failures.labels(event.command_name, self._finish(event)).inc()
+
+
+command_listener = CommandTimingListener()
+
+
+def pool_address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        mongodb_pool_connections.labels(pool_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongodb_pool_connections.labels(pool_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        mongodb_pool_checked_out.labels(pool_address(event)).inc()
+
+    def connection_checked_in(self, event):
+        mongodb_pool_checked_out.labels(pool_address(event)).dec()
+
+
+pool_listener = PoolListener()
+
+
+def pool_stats() -> dict:
+    pools: Dict[str, Dict[str, int]] = {}
+    for gauge, key in ((mongodb_pool_connections, "connections"), (mongodb_pool_checked_out, "checked_out")):
+        for metric in gauge.collect():
+            for sample in metric.samples:
+                pools.setdefault(sample.labels["address"], {})[key] = int(sample.value)
+    return pools
+
+
+class CacheCollector:
+    def collect(self):
+        stats = recommendations_cache.stats()
+        for counter in ("hits", "misses", "coalesced"):
+            yield CounterMetricFamily(
+                f"recommendations_cache_{counter}", f"Recommendations cache {counter}.", value=stats[counter]
+            )
+        yield GaugeMetricFamily("recommendations_cache_size", "Recommendations cache entries.", value=stats["size"])
+
+
+registry.register(CacheCollector())
+
+
+class WriteBehindCollector:
+    def collect(self):
+        pending = GaugeMetricFamily("write_behind_pending", "Writes waiting in a write-behind queue.", labels=["queue"])
+        batches = CounterMetricFamily("write_behind_batches", "Flushed write-behind batches.", labels=["queue"])
+        items = CounterMetricFamily("write_behind_items", "Writes flushed by a write-behind queue.", labels=["queue"])
+        for queue in queues:
+            stats = queue.stats()
+            pending.add_metric([queue.name], stats["pending"])
+            batches.add_metric([queue.name], stats["batches"])
+            items.add_metric([queue.name], stats["items"])
+        yield pending
+        yield batches
+        yield items
+
+
+registry.register(WriteBehindCollector())
+
+
+def route_template(scope) -> str:
+    # Label by route template rather than raw path so IDs in URLs don't explode the label cardinality.
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(scope)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timing = RequestTiming()
+        token = current_request_timing.set(timing)
+        in_flight = http_requests_in_flight.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.labels(method, route, str(status_code)).observe(time.perf_counter() - started)
+            http_request_mongodb_duration.labels(method, route).observe(timing.mongodb_seconds)
+            in_flight.dec()
+            current_request_timing.reset(token)
+
+
+def render_metrics():
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,31 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(review: dict) -> str:
+    last_reviewed = review.get("last_reviewed")
+    if isinstance(last_reviewed, datetime):
+        last_reviewed = last_reviewed.isoformat()
+    payload = json.dumps({"r": last_reviewed, "i": str(review["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[datetime], ObjectId]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        last_reviewed = payload["r"]
+        if last_reviewed is not None:
+            last_reviewed = datetime.fromisoformat(last_reviewed.replace("Z", "+00:00"))
+        return last_reviewed, ObjectId(payload["i"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError, AttributeError, InvalidId) as e:
+        raise InvalidCursor("Invalid pagination cursor.") from e
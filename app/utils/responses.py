@@ -0,0 +1,22 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from app.utils.enums import StatusEnum
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def dumps_line(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+def success_response(message: str, data: list, **extra: Any) -> FastJSONResponse:
+    # Rows are already in their output shape, so the response model is only used for the OpenAPI schema.
+    return FastJSONResponse({"status": StatusEnum.SUCCESS.value, "data": data, "message": message, **extra})
@@ -0,0 +1,111 @@
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Optional, Tuple
+
+MAX_ROW_BYTES = 1_048_576
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_MEDIA_TYPES = (NDJSON_MEDIA_TYPE, "application/jsonl", "application/ndjson")
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+async def _iter_text(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    """Yield ``(row, error)`` for every non-blank line; a malformed line yields ``(None, message)``."""
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        if len(buffer) > MAX_ROW_BYTES:
+            raise StreamFormatError(f"NDJSON line exceeds {MAX_ROW_BYTES} bytes.")
+        for line in lines:
+            if line.strip():
+                yield _loads_line(line)
+    if buffer.strip():
+        yield _loads_line(buffer)
+
+
+def _loads_line(line: str) -> Tuple[Any, Optional[str]]:
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, f"Invalid JSON: {e.msg}"
+
+
+class _TextReader:
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self._texts = _iter_text(chunks).__aiter__()
+        self._decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.eof = False
+
+    async def _read(self):
+        try:
+            self.buffer += await self._texts.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+
+    async def peek(self) -> str:
+        while True:
+            self.buffer = self.buffer.lstrip(" \t\r\n")
+            if self.buffer or self.eof:
+                return self.buffer[:1]
+            await self._read()
+
+    def consume(self):
+        self.buffer = self.buffer[1:]
+
+    async def value(self) -> Any:
+        if not await self.peek():
+            raise StreamFormatError("Unexpected end of JSON array.")
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer)
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise StreamFormatError(f"Invalid JSON: {e.msg}")
+                if len(self.buffer) > MAX_ROW_BYTES:
+                    raise StreamFormatError(f"JSON array element exceeds {MAX_ROW_BYTES} bytes.")
+            else:
+                # A scalar ending exactly at the buffer boundary might still be growing.
+                if end < len(self.buffer) or self.eof:
+                    self.buffer = self.buffer[end:]
+                    return value
+            await self._read()
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    """Yield ``(row, None)`` for each element of a top-level JSON array without buffering the whole body."""
+    reader = _TextReader(chunks)
+    if await reader.peek() != "[":
+        raise StreamFormatError("Expected a JSON array or an NDJSON body.")
+    reader.consume()
+
+    if await reader.peek() == "]":
+        reader.consume()
+    else:
+        while True:
+            yield await reader.value(), None
+            separator = await reader.peek()
+            reader.consume()
+            if not separator:
+                raise StreamFormatError("Unexpected end of JSON array.")
+            if separator == "]":
+                break
+            if separator != ",":
+                raise StreamFormatError("Expected ',' or ']' between JSON array elements.")
+
+    if await reader.peek():
+        raise StreamFormatError("Unexpected data after the JSON array.")
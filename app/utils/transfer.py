@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from app.models import LocationCategoryReviewCreate, serialize_review
+
+FORMATS = ("csv", "ndjson")
+CSV_FIELDS = ["_id", "latitude", "longitude", "category", "last_reviewed"]
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+last_reviewed_adapter = TypeAdapter(Optional[datetime])
+
+Row = Tuple[Any, Optional[str]]
+
+
+def detect_format(path: str, format: Optional[str] = None) -> str:
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Cannot tell the format of {path!r}, pass --format {'/'.join(FORMATS)}.")
+    return EXTENSIONS[extension]
+
+
+def iter_csv(stream: IO[str]) -> Iterator[Row]:
+    """Yield ``(payload, error)`` per CSV record, reshaped like the API body so the same model validates it."""
+    for record in csv.DictReader(stream):
+        yield {
+            "location": {"latitude": record.get("latitude"), "longitude": record.get("longitude")},
+            "category": {"name": record.get("category")},
+            "last_reviewed": record.get("last_reviewed") or None,
+        }, None
+
+
+def iter_ndjson_lines(stream: IO[str]) -> Iterator[Row]:
+    """Yield ``(payload, error)`` per non-blank line; a malformed line yields ``(None, message)``."""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), None
+        except json.JSONDecodeError as e:
+            yield None, f"Invalid JSON: {e.msg}"
+
+
+def iter_rows(stream: IO[str], format: str) -> Iterator[Row]:
+    return iter_csv(stream) if format == "csv" else iter_ndjson_lines(stream)
+
+
+def parse_row(payload: Any) -> Tuple[LocationCategoryReviewCreate, Optional[datetime]]:
+    """Validate one imported row; raises ``ValidationError``. Naive ``last_reviewed`` values are taken as UTC."""
+    review = LocationCategoryReviewCreate.model_validate(payload)
+    last_reviewed = last_reviewed_adapter.validate_python(payload.get("last_reviewed"))
+    if last_reviewed is not None and last_reviewed.tzinfo is None:
+        last_reviewed = last_reviewed.replace(tzinfo=timezone.utc)
+    return review, last_reviewed
+
+
+class Checkpoint:
+    """Rows known to be written, persisted so an interrupted import resumes after them.
+
+    Chunks finish out of order with several workers, so only the prefix of consecutive finished chunks
+    counts; rows after it are written again on resume, which the idempotent writes make harmless.
+    """
+
+    def __init__(self, path: Optional[str], source: str):
+        self.path = path
+        self.source = source
+        self.rows = 0
+        self.counts = {"inserted": 0, "existing": 0, "errors": 0}
+        self._finished: Dict[int, Tuple[int, dict]] = {}
+
+    def load(self) -> "Checkpoint":
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as stream:
+                state = json.load(stream)
+            if state.get("source") != self.source:
+                raise ValueError(f"Checkpoint {self.path!r} belongs to {state.get('source')!r}, not {self.source!r}.")
+            self.rows = state["rows"]
+            self.counts.update(state["counts"])
+        return self
+
+    def finish(self, first_row: int, rows: int, counts: dict):
+        self._finished[first_row] = (rows, counts)
+        advanced = False
+        while self.rows in self._finished:
+            rows, counts = self._finished.pop(self.rows)
+            self.rows += rows
+            for key, value in counts.items():
+                self.counts[key] += value
+            advanced = True
+        if advanced:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        # Written aside and renamed, so a crash mid-write never leaves a truncated checkpoint.
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as stream:
+            json.dump({"source": self.source, "rows": self.rows, "counts": self.counts}, stream)
+        os.replace(temporary, self.path)
+
+
+def csv_record(review: dict) -> list:
+    """A review document flattened to the ``CSV_FIELDS`` columns."""
+    row = serialize_review(review)
+    last_reviewed = row["last_reviewed"]
+    return [
+        row["_id"],
+        row["location"]["latitude"],
+        row["location"]["longitude"],
+        row["category"]["name"],
+        last_reviewed.isoformat() if last_reviewed is not None else "",
+    ]
@@ -0,0 +1,143 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, List, Optional
+
+WRITE_BEHIND_ENABLED = os.getenv("REVIEW_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("REVIEW_WRITE_BEHIND_MAX_BATCH", "500"))
+WRITE_BEHIND_MAX_DELAY = float(os.getenv("REVIEW_WRITE_BEHIND_MAX_DELAY_MS", "5")) / 1000
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("REVIEW_WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_PUT_TIMEOUT = float(os.getenv("REVIEW_WRITE_BEHIND_PUT_TIMEOUT_MS", "1000")) / 1000
+
+_STOP = object()
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class WriteBehindQueue:
+    """Micro-batches writes: callers submit an item and await its own result while one task flushes batches.
+
+    ``flush`` receives up to ``max_batch`` items collected within ``max_delay`` seconds of the first one and
+    returns one result per item, in order; an ``Exception`` in that list is raised to that item's caller only.
+    When the queue is full, ``submit`` waits up to ``put_timeout`` seconds and then raises ``WriteQueueFull``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        max_delay: float = WRITE_BEHIND_MAX_DELAY,
+        max_size: int = WRITE_BEHIND_QUEUE_SIZE,
+        put_timeout: float = WRITE_BEHIND_PUT_TIMEOUT,
+    ):
+        self.name = name
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self.put_timeout = put_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        # Created here rather than in __init__ so the queue belongs to the running event loop.
+        self._queue = asyncio.Queue(self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting items and wait until everything already queued has been flushed."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(_STOP)
+        await task
+
+    async def submit(self, item):
+        if self._task is None:
+            raise RuntimeError("The write-behind queue is not running.")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            # Backpressure: wait for the flusher to make room, but not longer than ``put_timeout``.
+            try:
+                await asyncio.wait_for(self._queue.put((item, future)), self.put_timeout)
+            except asyncio.TimeoutError:
+                raise WriteQueueFull("Too many pending writes, retry later.")
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self._queue.get()
+            if entry is _STOP:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.flush([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+        }
+
+
+queues: List[WriteBehindQueue] = []
+
+
+def register(queue: WriteBehindQueue) -> WriteBehindQueue:
+    """Add ``queue`` to the queues the app starts, drains on shutdown and reports in ``/metrics``."""
+    queues.append(queue)
+    return queue
+
+
+def start_queues():
+    for queue in queues:
+        queue.start()
+
+
+async def stop_queues():
+    for queue in queues:
+        await queue.stop()
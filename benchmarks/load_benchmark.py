@@ -0,0 +1,322 @@
+"""Seeded load test for the ASGI app with a JSON latency/throughput report.
+
+Seeds either an in-memory MongoDB stand-in or a real mongod, drives ``app.main.app`` in-process with a
+concurrent async client and reports throughput and p50/p95/p99 per endpoint. Pass ``--baseline`` with a
+report from an earlier commit to fail on regressions.
+
+    python -m benchmarks.load_benchmark --rows 10k --output report.json
+    python -m benchmarks.load_benchmark --backend mongo --rows 1M --baseline report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app import database
+from app.database import (
+    CATEGORIES_INDEXES,
+    HISTORY_INDEXES,
+    REVIEWS_INDEXES,
+    get_heatmap_collection,
+    get_history_collection,
+    get_reviews_collection,
+)
+from app.main import app
+from app.models import Category, Location, LocationCategoryReviewCreate
+from app.utils.cache import recommendations_cache
+from app.utils.categories import category_registry
+from app.utils.heatmap import HEATMAP_PRECISIONS, NEVER, cell_id, day_key
+from benchmarks.memory_backend import AsyncCollection, RoundTrip, memory_database
+
+SEED_BATCH_SIZE = 10_000
+COLLECTIONS = ("location_category_reviews", "categories", "counters", "heatmap_cells", "review_history")
+SAMPLE_IDS = 10_000
+HEATMAP_ZOOM = 6
+SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_count(value: str) -> int:
+    value = value.strip().lower()
+    if value and value[-1] in SUFFIXES:
+        return int(float(value[:-1]) * SUFFIXES[value[-1]])
+    return int(value)
+
+
+def random_review(rng: random.Random, categories: int) -> LocationCategoryReviewCreate:
+    return LocationCategoryReviewCreate.model_construct(
+        location=Location.model_construct(
+            latitude=round(rng.uniform(-60, 60), 6), longitude=round(rng.uniform(-180, 180), 6)
+        ),
+        category=Category.model_construct(name=f"Category {rng.randrange(categories)}"),
+    )
+
+
+def random_last_reviewed(rng: random.Random, now: datetime, never_share: float, stale_share: float):
+    draw = rng.random()
+    if draw < never_share:
+        return None
+    if draw < never_share + stale_share:
+        return now - timedelta(days=rng.uniform(31, 365))
+    return now - timedelta(days=rng.uniform(0, 29))
+
+
+def heatmap_cell(precision: int, cell: str, counts: Counter) -> dict:
+    """The document ``apply_changes`` would have built for ``counts`` reviews per day key."""
+    document = {"_id": cell_id(precision, cell), "precision": precision, "cell": cell}
+    if NEVER in counts:
+        document[NEVER] = counts[NEVER]
+    days = {key: count for key, count in counts.items() if key != NEVER}
+    if days:
+        document["days"] = days
+    return document
+
+
+async def seed(collection, heatmap, args, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    names = [f"Category {index}" for index in range(args.categories)]
+    category_ids = {name: await category_registry.get_id(name) for name in names}
+    sample: List[ObjectId] = []
+    seen = 0
+    # Heatmap cells are counted here and written once: an upsert per cell is what the app does on each write,
+    # but it makes seeding the in-memory backend take minutes.
+    cells: Dict[Tuple[int, str], Counter] = defaultdict(Counter)
+    for start in range(0, args.rows, SEED_BATCH_SIZE):
+        documents = []
+        for _ in range(min(SEED_BATCH_SIZE, args.rows - start)):
+            review = random_review(rng, args.categories)
+            document = review.to_document(category_ids[review.category.name])
+            document["last_reviewed"] = random_last_reviewed(rng, now, args.never_share, args.stale_share)
+            documents.append(document)
+        result = await collection.insert_many(documents, ordered=False)
+        for document in documents:
+            key = NEVER if document["last_reviewed"] is None else day_key(document["last_reviewed"])
+            for precision in HEATMAP_PRECISIONS:
+                cells[(precision, document["geohash"][:precision])][key] += 1
+        # Reservoir sample of IDs for the PATCH scenario, so 10M rows don't all stay in memory.
+        for inserted_id in result.inserted_ids:
+            seen += 1
+            if len(sample) < SAMPLE_IDS:
+                sample.append(inserted_id)
+            elif (slot := rng.randrange(seen)) < SAMPLE_IDS:
+                sample[slot] = inserted_id
+    if cells:
+        await heatmap.insert_many(
+            [heatmap_cell(precision, cell, counts) for (precision, cell), counts in cells.items()]
+        )
+    return sample
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+async def run_scenario(send, requests: int, concurrency: int) -> dict:
+    pending = iter(range(requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for index in pending:
+            started = time.perf_counter()
+            try:
+                response = await send(index)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(requests / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + max_regression):
+                regressions.append(f"{name} {metric}: {previous[metric]} -> {current[metric]}")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{name} throughput_rps: {previous['throughput_rps']} -> {current['throughput_rps']}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def open_database(args):
+    if args.backend == "memory":
+        db = memory_database(args.database)
+        round_trip = RoundTrip(args.latency_ms / 1000, args.connections)
+        return (AsyncCollection(db[name], round_trip) for name in COLLECTIONS), None
+    client = AsyncIOMotorClient(args.mongo_uri)
+    db = client[args.database]
+    for name in COLLECTIONS:
+        await db.drop_collection(name)
+    await db.location_category_reviews.create_indexes(REVIEWS_INDEXES)
+    await db.categories.create_indexes(CATEGORIES_INDEXES)
+    await db.review_history.create_indexes(HISTORY_INDEXES)
+    return (db[name] for name in COLLECTIONS), client
+
+
+@asynccontextmanager
+async def seeded_app(args, rng: random.Random):
+    """Seed the benchmark database, point the app at it and yield ``(client, review IDs, seed seconds)``."""
+    (collection, categories, counters, heatmap, history), client = await open_database(args)
+    app.dependency_overrides[get_reviews_collection] = lambda: collection
+    app.dependency_overrides[get_heatmap_collection] = lambda: heatmap
+    app.dependency_overrides[get_history_collection] = lambda: history
+    category_registry.bind(categories, counters)
+    category_registry.clear()
+    recommendations_cache.ttl = args.cache_ttl
+    recommendations_cache.invalidate()
+    try:
+        started = time.perf_counter()
+        review_ids = await seed(collection, heatmap, args, rng)
+        seed_seconds = time.perf_counter() - started
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+            yield http, review_ids, seed_seconds
+    finally:
+        app.dependency_overrides.pop(get_reviews_collection, None)
+        app.dependency_overrides.pop(get_heatmap_collection, None)
+        app.dependency_overrides.pop(get_history_collection, None)
+        category_registry.bind(database.categories_collection, database.counters_collection)
+        category_registry.clear()
+        if client is not None:
+            for name in COLLECTIONS:
+                await client[args.database].drop_collection(name)
+            client.close()
+
+
+def build_scenarios(http, rng: random.Random, args, review_ids: list) -> dict:
+    return {
+        "get_recommendations": lambda _: http.get("/exploration-recommendations/"),
+        "post_review": lambda _: http.post("/review/", json=random_review(rng, args.categories).to_json()),
+        "patch_review": lambda _: http.patch(
+            "/exploration-recommendations/", params={"location_id": str(rng.choice(review_ids))}
+        ),
+        "get_heatmap_tile": lambda _: http.get(
+            f"/heatmap/tiles/{HEATMAP_ZOOM}/{rng.randrange(2**HEATMAP_ZOOM)}/{rng.randrange(2**HEATMAP_ZOOM)}"
+        ),
+    }
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    async with seeded_app(args, rng) as (http, review_ids, seed_seconds):
+        scenarios = build_scenarios(http, rng, args, review_ids)
+        results = {}
+        for name in args.scenarios:
+            await run_scenario(scenarios[name], min(args.warmup, args.requests), args.concurrency)
+            results[name] = await run_scenario(scenarios[name], args.requests, args.concurrency)
+            print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "backend": args.backend,
+            "rows": args.rows,
+            "never_share": args.never_share,
+            "stale_share": args.stale_share,
+            "categories": args.categories,
+            "concurrency": args.concurrency,
+            "cache_ttl": args.cache_ttl,
+            "latency_ms": args.latency_ms,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "scenarios": results,
+    }
+
+
+def add_database_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--backend", choices=("memory", "mongo"), default="memory")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="map_my_world_benchmark", help="Dropped and reseeded on every run.")
+    parser.add_argument("--rows", type=parse_count, default=parse_count("10k"), help="Seeded reviews, e.g. 1M.")
+    parser.add_argument("--never-share", type=float, default=0.2, help="Share of never-reviewed rows.")
+    parser.add_argument("--stale-share", type=float, default=0.3, help="Share of rows reviewed over 30 days ago.")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Simulated round trip of the memory backend per call."
+    )
+    parser.add_argument(
+        "--connections", type=int, default=0, help="Simulated pool size of the memory backend; 0 is unlimited."
+    )
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument("--requests", type=int, default=2_000, help="Measured requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--cache-ttl", type=float, default=0.0, help="Recommendations cache TTL; 0 measures the database path."
+    )
+    parser.add_argument("--scenarios", nargs="+", default=["get_recommendations", "post_review", "patch_review"])
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Tolerated relative regression.")
+    args = parser.parse_args(argv)
+    if args.never_share + args.stale_share > 1:
+        parser.error("--never-share and --stale-share must add up to at most 1.")
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(report, json.load(baseline), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Motor-compatible async facade over mongomock, the in-memory MongoDB stand-in used by the benchmarks.
+
+Only the collection methods the routes call are adapted. Everything runs on the event loop thread, so
+latencies reflect the application's own overhead rather than a real server's, unless a simulated round trip
+is given: each call then sleeps ``latency`` seconds while holding one of the ``connections`` pool slots.
+"""
+
+import asyncio
+from itertools import islice
+
+import mongomock
+
+YIELD_EVERY = 100
+
+
+class RoundTrip:
+    def __init__(self, latency: float = 0.0, connections: int = 0):
+        self.latency = latency
+        self._pool = asyncio.Semaphore(connections) if connections else None
+
+    async def __aenter__(self):
+        if self._pool is not None:
+            await self._pool.acquire()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def __aexit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.release()
+
+
+NO_ROUND_TRIP = RoundTrip()
+
+
+class AsyncCursor:
+    def __init__(self, cursor, round_trip: RoundTrip = NO_ROUND_TRIP):
+        self._cursor = cursor
+        self._round_trip = round_trip
+
+    async def to_list(self, length=None):
+        async with self._round_trip:
+            return list(islice(self._cursor, length)) if length else list(self._cursor)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for index, document in enumerate(self._cursor):
+            if index % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+            yield document
+
+
+class AsyncCollection:
+    def __init__(self, collection, round_trip: RoundTrip = NO_ROUND_TRIP):
+        self._collection = collection
+        self._round_trip = round_trip
+
+    def find(self, filter=None, projection=None, sort=None, limit=0, batch_size=None, **kwargs):
+        cursor = self._collection.find(filter, projection, **kwargs)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return AsyncCursor(cursor, self._round_trip)
+
+    def aggregate(self, pipeline, **kwargs):
+        return AsyncCursor(iter(self._collection.aggregate(pipeline, **kwargs)), self._round_trip)
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            async with self._round_trip:
+                return method(*args, **kwargs)
+
+        return call
+
+
+def memory_database(name: str = "map_my_world"):
+    return mongomock.MongoClient()[name]
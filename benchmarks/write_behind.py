@@ -0,0 +1,93 @@
+"""Review writes per second with and without the write-behind queues.
+
+Runs ``POST /review/`` and ``PATCH /exploration-recommendations/`` twice against a freshly seeded database:
+once writing each request straight through and once with the write-behind queues batching them. On the
+memory backend, give each call a simulated round trip and pool size so batching has something to save.
+
+    python -m benchmarks.write_behind --latency-ms 1 --connections 10
+    python -m benchmarks.write_behind --backend mongo --rows 100k --concurrency 256
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+from datetime import datetime, timezone
+
+from app.routes.exploration_recommender_router import update_queue
+from app.routes.review_locations_router import create_queue
+from app.utils.write_behind import queues, start_queues, stop_queues
+from benchmarks.load_benchmark import add_database_arguments, build_scenarios, git_revision, run_scenario, seeded_app
+
+WRITE_SCENARIOS = ("post_review", "patch_review")
+MODES = ("direct", "write_behind")
+
+
+async def measure(args, mode: str) -> dict:
+    rng = random.Random(args.seed)
+    results = {}
+    async with seeded_app(args, rng) as (http, review_ids, _):
+        scenarios = build_scenarios(http, rng, args, review_ids)
+        if mode == "write_behind":
+            start_queues()
+        try:
+            for name in WRITE_SCENARIOS:
+                await run_scenario(scenarios[name], min(args.warmup, args.requests), args.concurrency)
+                results[name] = await run_scenario(scenarios[name], args.requests, args.concurrency)
+                print(f"{mode} {name}: {json.dumps(results[name])}", file=sys.stderr)
+        finally:
+            await stop_queues()
+    return results
+
+
+async def run(args) -> dict:
+    for queue in (create_queue, update_queue):
+        queue.max_batch = args.max_batch
+        queue.max_delay = args.max_delay_ms / 1000
+    modes = {mode: await measure(args, mode) for mode in MODES}
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "backend": args.backend,
+            "rows": args.rows,
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency_ms,
+            "connections": args.connections,
+            "max_batch": args.max_batch,
+            "max_delay_ms": args.max_delay_ms,
+            "seed": args.seed,
+        },
+        "modes": modes,
+        "batches": {queue.name: queue.stats() for queue in queues},
+        "speedup": {
+            name: round(modes["write_behind"][name]["throughput_rps"] / modes["direct"][name]["throughput_rps"], 2)
+            for name in WRITE_SCENARIOS
+            if modes["direct"][name]["throughput_rps"]
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_arguments(parser)
+    parser.add_argument("--requests", type=int, default=2_000, help="Measured writes per scenario and mode.")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured writes per scenario and mode.")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=create_queue.max_batch)
+    parser.add_argument("--max-delay-ms", type=float, default=create_queue.max_delay * 1000)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args(argv)
+    args.cache_ttl = 0.0
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
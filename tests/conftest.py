@@ -0,0 +1,38 @@
+import pytest
+
+from app.database import health
+from app.utils.cache import recommendations_cache
+from app.utils.categories import category_registry
+
+KNOWN_CATEGORIES = {1: "Test Category", 2: "Foo", 3: "Bar"}
+
+
+@pytest.fixture(autouse=True)
+def clear_recommendations_cache():
+    recommendations_cache.invalidate()
+    yield
+    recommendations_cache.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def reset_database_health():
+    health.available = None
+    health.initialized = False
+    yield
+    health.available = None
+    health.initialized = False
+
+
+@pytest.fixture(autouse=True)
+def clear_category_registry():
+    category_registry.clear()
+    yield
+    category_registry.clear()
+
+
+@pytest.fixture
+def known_categories():
+    # Pre-loaded as if read at startup, so creating reviews needs no categories collection round trip.
+    for category_id, name in KNOWN_CATEGORIES.items():
+        category_registry.remember(category_id, name)
+    return KNOWN_CATEGORIES
@@ -0,0 +1,137 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.main import app
+from app.models import serialize_review
+from app.utils.categories import CATEGORY_SEQUENCE, CategoryRegistry
+
+transport = httpx.ASGITransport(app=app)
+
+
+class MockCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for document in self.documents:
+            yield document
+
+
+def make_registry(categories=(), sequence=None):
+    collection, counters = MagicMock(), MagicMock()
+    collection.find.return_value = MockCursor([{"_id": _id, "name": name} for _id, name in categories])
+    collection.find_one = AsyncMock(return_value=None)
+    collection.insert_one = AsyncMock()
+    counters.find_one_and_update = AsyncMock(return_value={"_id": CATEGORY_SEQUENCE, "seq": sequence})
+    registry = CategoryRegistry()
+    registry.bind(collection, counters)
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_load_interns_names():
+    registry = make_registry([(1, "Foo"), (2, "Bar")])
+
+    await registry.load()
+
+    assert len(registry) == 2
+    assert registry.name(2) == "Bar"
+    assert registry.cached_id("Foo") == 1
+    assert registry.name(1) is registry.remember(1, "".join(["F", "oo"]))
+
+
+@pytest.mark.asyncio
+async def test_get_id_cached_does_not_query():
+    registry = make_registry()
+    registry.remember(7, "Foo")
+
+    assert await registry.get_id("Foo") == 7
+    registry.collection.find_one.assert_not_called()
+    registry.counters.find_one_and_update.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_id_reads_existing_category():
+    registry = make_registry()
+    registry.collection.find_one.return_value = {"_id": 4}
+
+    assert await registry.get_id("Foo") == 4
+    assert registry.name(4) == "Foo"
+    registry.counters.find_one_and_update.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_id_allocates_new_category():
+    registry = make_registry(sequence=12)
+
+    assert await registry.get_id("Foo") == 12
+    registry.collection.insert_one.assert_awaited_once_with({"_id": 12, "name": "Foo"})
+    assert registry.cached_id("Foo") == 12
+
+
+@pytest.mark.asyncio
+async def test_get_id_concurrent_creation_uses_winner():
+    registry = make_registry(sequence=12)
+    registry.collection.find_one.side_effect = [None, {"_id": 11}]
+    registry.collection.insert_one.side_effect = DuplicateKeyError("duplicate key")
+
+    assert await registry.get_id("Foo") == 11
+    assert registry.name(11) == "Foo"
+
+
+@pytest.mark.asyncio
+async def test_load_reviews_fetches_only_unknown_ids():
+    registry = make_registry([(2, "Bar")])
+    registry.remember(1, "Foo")
+
+    await registry.load_reviews([{"category_id": 1}, {"category_id": 2}, {"category": {"name": "Legacy"}}])
+
+    assert registry.collection.find.call_args.args[0] == {"_id": {"$in": [2]}}
+    assert registry.name(2) == "Bar"
+
+
+@pytest.mark.asyncio
+async def test_load_reviews_all_known_does_not_query():
+    registry = make_registry()
+    registry.remember(1, "Foo")
+
+    await registry.load_reviews([{"category_id": 1}])
+
+    registry.collection.find.assert_not_called()
+
+
+def test_serialize_review_accepts_both_formats(known_categories):
+    _id = ObjectId()
+    location = {"latitude": 1.0, "longitude": 2.0}
+
+    by_id = serialize_review({"_id": _id, "location": location, "category_id": 2})
+    embedded = serialize_review({"_id": _id, "location": location, "category": {"name": "Foo"}})
+
+    assert by_id == embedded
+    assert by_id["category"] == {"name": "Foo"}
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_resolve_category_ids():
+    reviews = [
+        {"_id": ObjectId(), "location": {"latitude": 1.0, "longitude": 2.0}, "category_id": 5, "last_reviewed": None}
+    ]
+
+    with patch("app.database.reviews_collection.find") as mock_find, patch(
+        "app.database.categories_collection.find", return_value=MockCursor([{"_id": 5, "name": "Museum"}])
+    ) as mock_categories_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=reviews)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/")
+            assert response.status_code == 200
+            assert response.json()["data"][0]["category"] == {"name": "Museum"}
+            assert mock_categories_find.call_args.args[0] == {"_id": {"$in": [5]}}
@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+from app.utils.etag import etag_matches, make_etag
+
+
+def test_make_etag_depends_on_version_key_and_window():
+    with patch("app.utils.etag.ETAG_WINDOW", 30):
+        etag = make_etag(3, (10, None), now=60)
+        assert etag == make_etag(3, (10, None), now=89)
+        assert etag != make_etag(3, (10, None), now=90)
+        assert etag != make_etag(4, (10, None), now=60)
+        assert etag != make_etag(3, (11, None), now=60)
+    with patch("app.utils.etag.ETAG_WINDOW", 0):
+        assert make_etag(3, (10, None)) is None
+
+
+def test_etag_matches():
+    etag = 'W/"abc"'
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"xyz", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"xyz"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("*", None)
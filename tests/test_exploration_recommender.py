@@ -1,17 +1,31 @@
+import asyncio
+import json
 from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, patch
 
 import httpx
+import mongomock
 import pytest
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 from app.database import get_reviews_collection
 from app.main import app
+from app.routes.exploration_recommender_router import diverse_pipeline
+from app.utils.cache import recommendations_cache
+from app.utils.categories import category_registry
 from app.utils.enums import StatusEnum
+from benchmarks.memory_backend import AsyncCollection, RoundTrip
 
 transport = httpx.ASGITransport(app=app)
 
 
+@pytest.fixture(autouse=True)
+def history_writes():
+    with patch("app.database.history_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write:
+        yield mock_bulk_write
+
+
 @pytest.mark.asyncio
 async def test_exploration_recommendations():
     async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
@@ -68,7 +82,13 @@ async def test_mock_collection_find_to_list():
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
             response = await client.get("/exploration-recommendations/")
             assert response.status_code == 200
-            assert response.json()["data"] == (mock_data + mock_data)[:10]
+            assert response.json()["data"] == mock_data
+
+            query = mock_find_never.call_args.args[0]
+            assert query["$or"][0] == {"last_reviewed": None}
+            assert mock_find_never.call_args.kwargs["sort"] == [("last_reviewed", 1), ("_id", 1)]
+            assert mock_find_never.call_args.kwargs["limit"] == 11
+            assert response.json()["next_cursor"] is None
 
 
 @pytest.mark.asyncio
@@ -78,15 +98,14 @@ async def test_update_review_success():
         "_id": location_id,
         "location": {"latitude": 10.36288, "longitude": -74.119442},
         "category": {"name": "Test Category"},
-        "last_reviewed": None,
+        "last_reviewed": datetime.now(timezone.utc),
     }
 
-    # Mock para `find_one` y `update_one`
-    with patch("app.database.reviews_collection.find_one", new_callable=AsyncMock) as mock_find_one, patch(
-        "app.database.reviews_collection.update_one", new_callable=AsyncMock
-    ) as mock_update_one:
-        mock_find_one.return_value = mock_review_data
-        mock_update_one.return_value = AsyncMock()
+    # Mock para `find_one_and_update`
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.return_value = mock_review_data
 
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
             response = await client.patch(f"/exploration-recommendations/?location_id={location_id}")
@@ -105,6 +124,11 @@ async def test_update_review_success():
             expected_last_reviewed = datetime.now(timezone.utc).replace(microsecond=0)
             assert response_last_reviewed.replace(microsecond=0) == expected_last_reviewed
 
+            query, update = mock_find_one_and_update.call_args.args
+            assert query == {"_id": ObjectId(location_id)}
+            assert list(update["$max"]) == ["last_reviewed"]
+            assert update["$unset"] == {"claimed_until": "", "claim_token": ""}
+
 
 @pytest.mark.asyncio
 async def test_update_review_no_database_connection():
@@ -135,8 +159,10 @@ async def test_update_review_invalid_id():
 async def test_update_review_not_found():
     location_id = str(ObjectId())
 
-    with patch("app.database.reviews_collection.find_one", new_callable=AsyncMock) as mock_find_one:
-        mock_find_one.return_value = None
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.return_value = None
 
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
             response = await client.patch(f"/exploration-recommendations/?location_id={location_id}")
@@ -165,19 +191,746 @@ async def test_exploration_recommendations_unexpected_error():
 @pytest.mark.asyncio
 async def test_update_review_unexpected_error():
     location_id = str(ObjectId())
+
+    with patch("app.database.reviews_collection.find_one_and_update", side_effect=Exception("Unexpected update error")):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.patch(f"/exploration-recommendations/?location_id={location_id}")
+            assert response.status_code == 500
+            assert response.json()["detail"] == "Unexpected update error"
+
+
+@pytest.mark.asyncio
+async def test_nearby_exploration_recommendations():
+    mock_data = [
+        {
+            "_id": str(ObjectId()),
+            "location": {"latitude": 10.36288, "longitude": -74.119442},
+            "category": {"name": "Foo"},
+            "geo": {"type": "Point", "coordinates": [-74.119442, 10.36288]},
+            "last_reviewed": None,
+            "distance_m": 12.5,
+        }
+    ]
+
+    with patch("app.database.reviews_collection.aggregate") as mock_aggregate:
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(return_value=mock_data)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get(
+                "/exploration-recommendations/nearby", params={"lat": 10.36, "lon": -74.11, "radius_m": 500}
+            )
+            assert response.status_code == 200
+            assert response.json()["data"] == [
+                {
+                    "_id": mock_data[0]["_id"],
+                    "location": {"latitude": 10.36288, "longitude": -74.119442},
+                    "category": {"name": "Foo"},
+                    "last_reviewed": None,
+                }
+            ]
+
+            geo_near = mock_aggregate.call_args.args[0][0]["$geoNear"]
+            assert geo_near["near"] == {"type": "Point", "coordinates": [-74.11, 10.36]}
+            assert geo_near["maxDistance"] == 500
+            assert geo_near["key"] == "geo"
+
+
+@pytest.mark.asyncio
+async def test_nearby_exploration_recommendations_empty():
+    with patch("app.database.reviews_collection.aggregate") as mock_aggregate:
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(return_value=[])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/nearby", params={"lat": 10.36, "lon": -74.11})
+            assert response.status_code == 200
+            assert response.json()["data"] == []
+            assert response.json()["message"] == "No exploration recommendations available nearby."
+
+
+@pytest.mark.asyncio
+async def test_nearby_exploration_recommendations_invalid_radius():
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get(
+            "/exploration-recommendations/nearby", params={"lat": 10.36, "lon": -74.11, "radius_m": 0}
+        )
+        assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_review():
+    found_id, missing_id = ObjectId(), ObjectId()
+    reviewed_at = "2024-11-05T15:30:00Z"
+
+    with patch("app.database.reviews_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write, patch(
+        "app.database.reviews_collection.find"
+    ) as mock_find, patch("app.database.heatmap_collection.bulk_write", new_callable=AsyncMock) as mock_heatmap:
+        mock_bulk_write.return_value.modified_count = 1
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(
+            return_value=[{"_id": found_id, "geohash": "d6cqk4r8mkzc", "last_reviewed": datetime(2024, 1, 2)}]
+        )
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.patch(
+                "/exploration-recommendations/bulk",
+                json=[
+                    {"location_id": str(found_id), "reviewed_at": reviewed_at},
+                    {"location_id": str(missing_id)},
+                    {"location_id": "invalid_object_id"},
+                ],
+            )
+            assert response.status_code == 200
+            assert response.json()["message"] == "1 reviews updated successfully."
+            assert response.json()["data"] == [
+                {
+                    "matched": [str(found_id)],
+                    "modified_count": 1,
+                    "not_found": [str(missing_id)],
+                    "invalid": ["invalid_object_id"],
+                }
+            ]
+
+            assert mock_find.call_args.args == (
+                {"_id": {"$in": [found_id, missing_id]}},
+                {"geohash": 1, "last_reviewed": 1, "category_id": 1},
+            )
+            operations = mock_bulk_write.call_args.args[0]
+            assert [operation._filter for operation in operations] == [{"_id": found_id}]
+            assert operations[0]._doc == {
+                "$max": {"last_reviewed": datetime(2024, 11, 5, 15, 30, tzinfo=timezone.utc)},
+                "$unset": {"claimed_until": "", "claim_token": ""},
+            }
+            assert mock_bulk_write.call_args.kwargs["ordered"] is False
+
+            cells = mock_heatmap.call_args.args[0]
+            assert cells[0]._filter == {"_id": "4:d6cq"}
+            assert cells[0]._doc["$inc"] == {"days.20240102": -1, "days.20241105": 1}
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_review_keeps_later_review():
+    review_id = ObjectId()
+
+    with patch("app.database.reviews_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write, patch(
+        "app.database.reviews_collection.find"
+    ) as mock_find, patch("app.database.heatmap_collection.bulk_write", new_callable=AsyncMock) as mock_heatmap:
+        mock_bulk_write.return_value.modified_count = 0
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(
+            return_value=[{"_id": review_id, "geohash": "d6cqk4r8mkzc", "last_reviewed": datetime(2024, 11, 6)}]
+        )
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            # A late sync of an older review, with an offset and without one.
+            for reviewed_at in ("2024-11-05T23:30:00-05:00", "2024-11-05T15:30:00"):
+                response = await client.patch(
+                    "/exploration-recommendations/bulk",
+                    json=[{"location_id": str(review_id), "reviewed_at": reviewed_at}],
+                )
+                assert response.status_code == 200
+                (operation,) = mock_bulk_write.call_args.args[0]
+                assert list(operation._doc["$max"]) == ["last_reviewed"]
+                assert operation._doc["$max"]["last_reviewed"].tzinfo == timezone.utc
+            mock_heatmap.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_review_rejects_future_dates():
+    future = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+
+    with patch("app.database.reviews_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            for reviewed_at in (future, "2999-01-01T00:00:00Z"):
+                response = await client.patch(
+                    "/exploration-recommendations/bulk",
+                    json=[{"location_id": str(ObjectId()), "reviewed_at": reviewed_at}],
+                )
+                assert response.status_code == 422
+                assert "reviewed_at can't be in the future." in response.json()["detail"][0]["msg"]
+        mock_bulk_write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_review_all_matched():
+    review_ids = [ObjectId(), ObjectId()]
+
+    with patch("app.database.reviews_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write, patch(
+        "app.database.reviews_collection.find"
+    ) as mock_find:
+        mock_bulk_write.return_value.modified_count = 2
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=[{"_id": _id} for _id in review_ids])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.patch(
+                "/exploration-recommendations/bulk", json=[{"location_id": str(_id)} for _id in review_ids]
+            )
+            assert response.status_code == 200
+            assert response.json()["data"][0]["matched"] == [str(_id) for _id in review_ids]
+            assert response.json()["data"][0]["not_found"] == []
+            # The single up-front read replaces the follow-up lookup of missing IDs.
+            mock_find.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_review_none_found():
+    review_ids = [ObjectId(), ObjectId()]
+
+    with patch("app.database.reviews_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write, patch(
+        "app.database.reviews_collection.find"
+    ) as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=[])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.patch(
+                "/exploration-recommendations/bulk", json=[{"location_id": str(_id)} for _id in review_ids]
+            )
+            assert response.status_code == 200
+            assert response.json()["data"][0]["matched"] == []
+            assert response.json()["data"][0]["not_found"] == [str(_id) for _id in review_ids]
+            mock_find.assert_called_once()
+            mock_bulk_write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_update_review_moves_heatmap_counter(history_writes, known_categories):
+    location_id = ObjectId()
+    before = {
+        "_id": location_id,
+        "location": {"latitude": 10.36288, "longitude": -74.119442},
+        "category_id": 1,
+        "geohash": "d6cqk4r8mkzc",
+        "last_reviewed": None,
+    }
+
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update, patch(
+        "app.database.heatmap_collection.bulk_write", new_callable=AsyncMock
+    ) as mock_heatmap:
+        mock_find_one_and_update.return_value = before
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.patch(f"/exploration-recommendations/?location_id={location_id}")
+            assert response.status_code == 200
+            assert response.json()["data"][0]["last_reviewed"] is not None
+            assert mock_find_one_and_update.call_args.kwargs["return_document"] == ReturnDocument.BEFORE
+
+            today = datetime.now(timezone.utc).strftime("%Y%m%d")
+            cells = mock_heatmap.call_args.args[0]
+            assert [cell._filter["_id"] for cell in cells] == ["4:d6cq", "5:d6cqk", "6:d6cqk4"]
+            assert cells[0]._doc["$inc"] == {"never": -1, f"days.{today}": 1}
+
+            (bucket,) = history_writes.call_args.args[0]
+            assert bucket._filter["review_id"] == location_id
+            assert bucket._filter["month"].day == 1
+            assert bucket._doc["$inc"] == {"count": 1}
+            assert bucket._doc["$setOnInsert"] == {"category_id": 1}
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_review_empty_body():
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.patch("/exploration-recommendations/bulk", json=[])
+        assert response.status_code == 422
+
+
+def mock_reviews(count, last_reviewed=None):
+    return [
+        {
+            "_id": ObjectId(),
+            "location": {"latitude": 10.0 + index, "longitude": -74.0},
+            "category": {"name": f"Category {index}"},
+            "last_reviewed": last_reviewed,
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_pagination():
+    first_page = mock_reviews(3)
+    second_page = mock_reviews(1, last_reviewed=datetime(2024, 1, 1))
+
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(side_effect=[first_page, second_page])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"limit": 2})
+            assert response.status_code == 200
+            assert [review["_id"] for review in response.json()["data"]] == [str(r["_id"]) for r in first_page[:2]]
+            next_cursor = response.json()["next_cursor"]
+            assert next_cursor is not None
+            assert mock_find.call_args.kwargs["limit"] == 3
+
+            response = await client.get("/exploration-recommendations/", params={"limit": 2, "cursor": next_cursor})
+            assert response.status_code == 200
+            assert response.json()["next_cursor"] is None
+            assert response.json()["data"][0]["_id"] == str(second_page[0]["_id"])
+            assert response.json()["data"][0]["last_reviewed"] == "2024-01-01T00:00:00"
+            assert mock_find.call_args.args[1] == {"location": 1, "category_id": 1, "category": 1, "last_reviewed": 1}
+
+            query = mock_find.call_args.args[0]
+            assert query["$or"][0] == {"last_reviewed": None, "_id": {"$gt": first_page[1]["_id"]}}
+            assert "$lt" in query["$or"][1]["last_reviewed"]
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_cursor_after_reviewed_row():
+    reviewed = mock_reviews(2, last_reviewed=datetime(2024, 1, 1))
+
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=reviewed)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"limit": 1})
+            next_cursor = response.json()["next_cursor"]
+
+            await client.get("/exploration-recommendations/", params={"cursor": next_cursor})
+            query = mock_find.call_args.args[0]
+            assert query["$or"][0] == {"last_reviewed": datetime(2024, 1, 1), "_id": {"$gt": reviewed[0]["_id"]}}
+            assert query["$or"][1]["last_reviewed"]["$gt"] == datetime(2024, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_invalid_cursor():
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get("/exploration-recommendations/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 422
+        assert response.json()["detail"] == "Invalid pagination cursor."
+
+
+class MockCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for document in self.documents:
+            yield document
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_ndjson_stream():
+    reviews = mock_reviews(3)
+
+    with patch("app.database.reviews_collection.find", return_value=MockCursor(reviews)) as mock_find:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", headers={"Accept": "application/x-ndjson"})
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert [line["_id"] for line in lines] == [str(review["_id"]) for review in reviews]
+            assert lines[0]["category"] == {"name": "Category 0"}
+            assert "limit" not in mock_find.call_args.kwargs
+
+
+@pytest.mark.asyncio
+async def test_claim_exploration_recommendations():
+    reviews = mock_reviews(2)
+
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        # Only two pairs are left to claim, so the third call finds nothing and the loop stops.
+        mock_find_one_and_update.side_effect = [*reviews, None]
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/exploration-recommendations/claim", params={"count": 3, "lease_seconds": 60})
+            assert response.status_code == 200
+            assert response.json()["message"] == "Exploration recommendations claimed successfully."
+            assert [review["_id"] for review in response.json()["data"]] == [str(r["_id"]) for r in reviews]
+
+            claimed_until = datetime.fromisoformat(response.json()["claimed_until"].replace("Z", "+00:00"))
+            assert timedelta(seconds=55) < claimed_until - datetime.now(timezone.utc) <= timedelta(seconds=60)
+
+            assert mock_find_one_and_update.await_count == 3
+            claimable, update = mock_find_one_and_update.call_args.args
+            assert {"claimed_until": None} in claimable["$and"][1]["$or"]
+            assert update["$set"]["claimed_until"] == claimed_until
+            assert isinstance(update["$set"]["claim_token"], ObjectId)
+            assert mock_find_one_and_update.call_args.kwargs["sort"] == [("last_reviewed", 1), ("_id", 1)]
+            assert mock_find_one_and_update.call_args.kwargs["return_document"] == ReturnDocument.AFTER
+
+
+@pytest.mark.asyncio
+async def test_claim_exploration_recommendations_empty():
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.return_value = None
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/exploration-recommendations/claim")
+            assert response.status_code == 200
+            assert response.json()["data"] == []
+            assert response.json()["claimed_until"] is None
+            mock_find_one_and_update.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("available", [200, 45])
+async def test_claim_exploration_recommendations_concurrent_callers(known_categories, available):
+    collection = mongomock.MongoClient().db.location_category_reviews
+    collection.insert_many(
+        [
+            {"location": {"latitude": 0.0, "longitude": i / 100}, "category_id": 1, "last_reviewed": None}
+            for i in range(available)
+        ]
+    )
+    # Every call yields to the event loop first, so the callers' claims interleave as they would on a server.
+    app.dependency_overrides[get_reviews_collection] = lambda: AsyncCollection(collection, RoundTrip(0.001))
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            responses = await asyncio.gather(
+                *(client.post("/exploration-recommendations/claim", params={"count": 10}) for _ in range(8))
+            )
+    finally:
+        app.dependency_overrides.pop(get_reviews_collection)
+
+    claims = [[review["_id"] for review in response.json()["data"]] for response in responses]
+    claimed = [_id for claim in claims for _id in claim]
+    assert len(claimed) == len(set(claimed)) == min(8 * 10, available)
+    assert collection.count_documents({"claim_token": {"$exists": True}}) == len(claimed)
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_cache_coalesces_concurrent_misses():
+    reviews = mock_reviews(2)
+    before = recommendations_cache.stats()
+
+    async def slow_to_list(length):
+        await asyncio.sleep(0.05)
+        return reviews
+
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(side_effect=slow_to_list)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            responses = await asyncio.gather(*(client.get("/exploration-recommendations/") for _ in range(5)))
+            assert {response.status_code for response in responses} == {200}
+            assert mock_find.call_count == 1
+
+            response = await client.get("/exploration-recommendations/")
+            assert response.json()["data"] == responses[0].json()["data"]
+            assert mock_find.call_count == 1
+
+            response = await client.get("/exploration-recommendations/cache")
+            assert response.status_code == 200
+            stats = response.json()["data"][0]
+            assert [stats[counter] - before[counter] for counter in ("misses", "coalesced", "hits")] == [1, 4, 1]
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_cache_keyed_by_query_parameters():
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=mock_reviews(1))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            await client.get("/exploration-recommendations/", params={"limit": 5})
+            await client.get("/exploration-recommendations/", params={"limit": 5})
+            await client.get("/exploration-recommendations/", params={"limit": 6})
+            assert mock_find.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_cache_invalidated_by_writes():
+    location_id = str(ObjectId())
     mock_review_data = {
         "_id": location_id,
         "location": {"latitude": 10.36288, "longitude": -74.119442},
         "category": {"name": "Test Category"},
-        "last_reviewed": None,
+        "last_reviewed": datetime.now(timezone.utc),
     }
 
-    with patch("app.database.reviews_collection.find_one", new_callable=AsyncMock) as mock_find_one, patch(
-        "app.database.reviews_collection.update_one", side_effect=Exception("Unexpected update error")
+    with patch("app.database.reviews_collection.find") as mock_find, patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock, return_value=mock_review_data
     ):
-        mock_find_one.return_value = mock_review_data
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=mock_reviews(1))
 
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
-            response = await client.patch(f"/exploration-recommendations/?location_id={location_id}")
+            await client.get("/exploration-recommendations/")
+            await client.patch(f"/exploration-recommendations/?location_id={location_id}")
+            await client.get("/exploration-recommendations/")
+            assert mock_find.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_not_modified():
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=mock_reviews(2))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/")
+            etag = response.headers["etag"]
+            assert etag.startswith('W/"')
+
+            before = recommendations_cache.stats()
+            response = await client.get("/exploration-recommendations/", headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+            assert mock_find.call_count == 1
+            assert recommendations_cache.stats()["hits"] == before["hits"]
+
+            response = await client.get(
+                "/exploration-recommendations/", params={"limit": 5}, headers={"If-None-Match": etag}
+            )
+            assert response.status_code == 200
+            assert response.headers["etag"] != etag
+
+            response = await client.get(
+                "/exploration-recommendations/", headers={"Accept": "application/x-ndjson", "If-None-Match": etag}
+            )
+            assert response.status_code == 200
+            assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_etag_changes_with_writes():
+    location_id = str(ObjectId())
+    review = {
+        "_id": location_id,
+        "location": {"latitude": 10.36288, "longitude": -74.119442},
+        "category": {"name": "Test Category"},
+        "last_reviewed": datetime.now(timezone.utc),
+    }
+
+    with patch("app.database.reviews_collection.find") as mock_find, patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock, return_value=review
+    ):
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=mock_reviews(1))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            etag = (await client.get("/exploration-recommendations/")).headers["etag"]
+            await client.patch(f"/exploration-recommendations/?location_id={location_id}")
+
+            response = await client.get("/exploration-recommendations/", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["etag"] != etag
+            assert mock_find.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_cache_skips_errors():
+    with patch("app.database.reviews_collection.find", side_effect=Exception("Database error")):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/")
             assert response.status_code == 500
-            assert response.json()["detail"] == "Unexpected update error"
+    assert recommendations_cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_category_filter(known_categories):
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=mock_reviews(1))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"category": ["Bar", " Foo ", "Bar"]})
+            assert response.status_code == 200
+            query = mock_find.call_args.args[0]
+            assert query["$and"][1] == {"category_id": {"$in": [2, 3]}}
+            assert "$or" in query["$and"][0]
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_unknown_category():
+    with patch("app.database.categories_collection.find_one", new_callable=AsyncMock) as mock_find_one, patch(
+        "app.database.reviews_collection.find"
+    ) as mock_find:
+        mock_find_one.return_value = None
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"category": "Nowhere"})
+            assert response.status_code == 200
+            assert response.json()["data"] == []
+            mock_find.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_bbox_filter():
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=mock_reviews(1))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"bbox": "-74.5,10,-72,11.5"})
+            assert response.status_code == 200
+            bbox = mock_find.call_args.args[0]["$and"][1]
+            ring = bbox["geo"]["$geoWithin"]["$geometry"]["coordinates"][0]
+            assert ring[0] == ring[-1] == [-74.5, 10.0]
+            assert {lat for _, lat in ring} == {10.0, 11.5}
+            assert len(ring) == 2 * 3 + 1
+            assert bbox["location.longitude"] == {"$gte": -74.5, "$lte": -72.0}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bbox", ["1,2,3", "a,b,c,d", "10,0,5,1", "-170,0,20,1", "0,-91,1,1"])
+async def test_exploration_recommendations_invalid_bbox(bbox):
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get("/exploration-recommendations/", params={"bbox": bbox})
+        assert response.status_code == 422
+        assert response.json()["detail"].startswith("bbox must")
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_diverse():
+    with patch("app.database.reviews_collection.aggregate") as mock_aggregate, patch(
+        "app.database.reviews_collection.distinct", new_callable=AsyncMock, return_value=[1, 2, 3]
+    ) as mock_distinct:
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(return_value=mock_reviews(2))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get(
+                "/exploration-recommendations/", params={"diverse": "true", "per_category": 1, "limit": 5}
+            )
+            assert response.status_code == 200
+            assert len(response.json()["data"]) == 2
+            assert response.json()["next_cursor"] is None
+            mock_distinct.assert_awaited_once_with("category_id")
+            pipeline = mock_aggregate.call_args.args[0]
+            assert pipeline[0]["$match"]["$and"][1] == {"category_id": 1}
+            assert pipeline[2] == {"$limit": 1}
+            unions = [stage["$unionWith"] for stage in pipeline if "$unionWith" in stage]
+            assert [union["pipeline"][0]["$match"]["$and"][1] for union in unions] == [
+                {"category_id": 2},
+                {"category_id": 3},
+            ]
+            assert {union["coll"] for union in unions} == {"location_category_reviews"}
+            assert pipeline[-1] == {"$limit": 5}
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_diverse_uses_category_filter(known_categories):
+    with patch("app.database.reviews_collection.aggregate") as mock_aggregate, patch(
+        "app.database.reviews_collection.distinct", new_callable=AsyncMock
+    ) as mock_distinct:
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(return_value=mock_reviews(1))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get(
+                "/exploration-recommendations/", params={"diverse": "true", "category": ["Foo", "Bar"]}
+            )
+            assert response.status_code == 200
+            mock_distinct.assert_not_awaited()
+            pipeline = mock_aggregate.call_args.args[0]
+            assert len([stage for stage in pipeline if "$unionWith" in stage]) == 1
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_diverse_needs_filter_over_many_categories():
+    detail = "Diverse recommendations over more than 20 categories need a category filter."
+
+    with patch("app.database.reviews_collection.aggregate") as mock_aggregate, patch(
+        "app.database.reviews_collection.distinct", new_callable=AsyncMock
+    ) as mock_distinct:
+        mock_distinct.return_value = list(range(1, 1501))
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(return_value=[])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"diverse": "true"})
+            assert response.status_code == 422
+            assert response.json() == {"detail": detail}
+            mock_aggregate.assert_not_called()
+
+            # Once the registry knows that many categories, the distinct isn't sent at all.
+            for category_id in range(1, 22):
+                category_registry.remember(category_id, f"Category {category_id}")
+            mock_distinct.reset_mock()
+            response = await client.get("/exploration-recommendations/", params={"diverse": "true"})
+            assert response.status_code == 422
+            mock_distinct.assert_not_awaited()
+
+            response = await client.get(
+                "/exploration-recommendations/", params={"diverse": "true", "category": ["Category 1", "Category 2"]}
+            )
+            assert response.status_code == 200
+            assert len([stage for stage in mock_aggregate.call_args.args[0] if "$unionWith" in stage]) == 1
+
+
+@pytest.mark.asyncio
+async def test_exploration_recommendations_diverse_rejects_cursor():
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get("/exploration-recommendations/", params={"diverse": "true", "cursor": "abc"})
+        assert response.status_code == 422
+
+
+def run_diverse_pipeline(collection, pipeline):
+    # mongomock has no $unionWith: run every branch on its own, then sort and limit their union.
+    branches = [pipeline[:4]] + [stage["$unionWith"]["pipeline"] for stage in pipeline if "$unionWith" in stage]
+    merged = mongomock.MongoClient().db.merged
+    for branch in branches:
+        documents = list(collection.aggregate(branch))
+        if documents:
+            merged.insert_many(documents)
+    return list(merged.aggregate(pipeline[-2:]))
+
+
+def test_diverse_pipeline_caps_each_category():
+    collection = mongomock.MongoClient().db.reviews
+    start = datetime(2024, 1, 1)
+    # Category 1 holds the five stalest reviews; without the cap it would fill the whole page.
+    collection.insert_many(
+        [
+            {"location": {"latitude": 0.0, "longitude": float(i)}, "category_id": 1, "last_reviewed": None}
+            for i in range(5)
+        ]
+        + [
+            {
+                "location": {"latitude": 1.0, "longitude": float(i)},
+                "category_id": category_id,
+                "last_reviewed": start + timedelta(days=i),
+            }
+            for category_id in (2, 3)
+            for i in range(3)
+        ]
+    )
+
+    pipeline = diverse_pipeline("reviews", {}, [1, 2, 3], limit=5, per_category=2)
+    recommendations = run_diverse_pipeline(collection, pipeline)
+
+    assert [review["category_id"] for review in recommendations] == [1, 1, 2, 3, 2]
+    assert [review["last_reviewed"] for review in recommendations][2:] == [start, start, start + timedelta(days=1)]
+
+
+def test_diverse_pipeline_reaches_past_a_dense_category():
+    collection = mongomock.MongoClient().db.reviews
+    start = datetime(2024, 1, 1)
+    # 6000 never-reviewed rows in one category sort ahead of everything the other categories hold.
+    collection.insert_many(
+        [
+            {"location": {"latitude": 0.0, "longitude": i / 100}, "category_id": 1, "last_reviewed": None}
+            for i in range(6000)
+        ]
+        + [
+            {
+                "location": {"latitude": 1.0, "longitude": float(i)},
+                "category_id": 2 + i % 6,
+                "last_reviewed": start + timedelta(days=i),
+            }
+            for i in range(30)
+        ]
+    )
+
+    pipeline = diverse_pipeline("reviews", {}, list(range(1, 8)), limit=10, per_category=2)
+    recommendations = run_diverse_pipeline(collection, pipeline)
+
+    categories = [review["category_id"] for review in recommendations]
+    assert categories == [1, 1, 2, 3, 4, 5, 6, 7, 2, 3]
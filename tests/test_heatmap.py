@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.main import app
+from app.utils import geohash
+from app.utils.heatmap import MISSING, cell_counts, cell_updates
+
+transport = httpx.ASGITransport(app=app)
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude, expected",
+    [(57.64911, 10.40744, "u4pruydqqvj"), (-25.382708, -49.265506, "6gkzwgjz"), (0.0, 0.0, "s0000")],
+)
+def test_geohash_encode(latitude, longitude, expected):
+    assert geohash.encode(latitude, longitude, len(expected)) == expected
+
+
+def test_geohash_bounds_contain_point():
+    min_lon, min_lat, max_lon, max_lat = geohash.bounds("u4pruydqqvj")
+    assert min_lon <= 10.40744 <= max_lon
+    assert min_lat <= 57.64911 <= max_lat
+    assert (max_lon - min_lon, max_lat - min_lat) == pytest.approx(geohash.cell_size(11))
+
+
+def test_geohash_covering_cells():
+    cells = geohash.covering_cells((-0.1, -0.1, 0.1, 0.1), 1)
+    assert sorted(cells) == ["7", "e", "k", "s"]
+    assert geohash.covering_count((-0.1, -0.1, 0.1, 0.1), 1) == 4
+    assert len(geohash.covering_cells((-10, -10, 10, 10), 3)) == geohash.covering_count((-10, -10, 10, 10), 3)
+
+
+def test_tile_bounds_and_precision():
+    min_lon, min_lat, max_lon, max_lat = geohash.tile_bounds(0, 0, 0)
+    assert (min_lon, max_lon) == (-180, 180)
+    assert max_lat == pytest.approx(85.0511, abs=1e-4) and min_lat == pytest.approx(-85.0511, abs=1e-4)
+    assert geohash.precision_for_tile(0) == 1
+    assert geohash.precision_for_tile(10) == 5
+
+
+def test_cell_updates_fold_changes_per_cell():
+    reviewed_at = datetime(2024, 11, 5, 15, 30)
+    updates = cell_updates(
+        [
+            ("u4pruydqqvj8", MISSING, None),
+            ("u4pruydqqvj8", None, reviewed_at),
+            ("u4pzzzzzzzzz", MISSING, None),
+        ],
+        precisions=[4, 5],
+    )
+
+    by_cell = {update._filter["_id"]: update._doc for update in updates}
+    assert by_cell["4:u4pr"]["$inc"] == {"days.20241105": 1}
+    assert by_cell["4:u4pz"]["$inc"] == {"never": 1}
+    assert by_cell["5:u4pru"]["$setOnInsert"] == {"precision": 5, "cell": "u4pru"}
+    assert all(update._upsert for update in updates)
+
+
+def test_cell_updates_count_utc_days():
+    # 23:30 in Bogotá is already the next day in UTC, which is what MongoDB stores and what the next review reads.
+    reviewed_at = datetime(2024, 11, 5, 23, 30, tzinfo=timezone(timedelta(hours=-5)))
+    (reviewed,) = cell_updates([("u4pruydqqvj8", None, reviewed_at)], precisions=[4])
+    (reviewed_again,) = cell_updates([("u4pruydqqvj8", datetime(2024, 11, 6, 4, 30), None)], precisions=[4])
+    assert reviewed._doc["$inc"] == {"never": -1, "days.20241106": 1}
+    assert reviewed_again._doc["$inc"] == {"days.20241106": -1, "never": 1}
+
+
+def test_cell_updates_skip_noops():
+    assert cell_updates([("u4pruydqqvj8", None, None), (None, MISSING, None)], precisions=[4]) == []
+
+
+def test_cell_counts_classify_days():
+    document = {"never": 2, "days": {"20240101": 3, "20241001": 4, "20241105": 1}}
+    assert cell_counts(document, datetime(2024, 10, 1)) == {"never": 2, "stale": 3, "fresh": 5}
+
+
+@pytest.mark.asyncio
+async def test_geohash_heatmap_materialized():
+    fresh_day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    with patch("app.database.heatmap_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(
+            return_value=[
+                {"_id": "5:d3g6c", "precision": 5, "cell": "d3g6c", "never": 1, "days": {fresh_day: 2, "20200101": 1}},
+                {"_id": "5:d3g6f", "precision": 5, "cell": "d3g6f", "never": 0, "days": {}},
+            ]
+        )
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/heatmap/geohash", params={"bbox": "-74.2,10.3,-74.0,10.4", "precision": 5})
+            assert response.status_code == 200
+            body = response.json()
+            assert body["precision"] == 5 and body["materialized"] is True
+            assert body["data"] == [
+                {
+                    "cell": "d3g6c",
+                    "bounds": list(geohash.bounds("d3g6c")),
+                    "never": 1,
+                    "stale": 1,
+                    "fresh": 2,
+                }
+            ]
+            ids = mock_find.call_args.args[0]["_id"]["$in"]
+            assert "5:d3g6c" in ids
+            assert len(ids) == geohash.covering_count((-74.2, 10.3, -74.0, 10.4), 5)
+
+
+@pytest.mark.asyncio
+async def test_geohash_heatmap_aggregates_other_precisions():
+    with patch("app.database.reviews_collection.aggregate") as mock_aggregate:
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(
+            return_value=[{"_id": "d3g6cqe", "never": 1, "stale": 2, "total": 6}]
+        )
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get(
+                "/heatmap/geohash", params={"bbox": "-74.1195,10.3628,-74.1193,10.3630", "precision": 7}
+            )
+            assert response.status_code == 200
+            assert response.json()["materialized"] is False
+            assert response.json()["data"][0]["cell"] == "d3g6cqe"
+            assert response.json()["data"][0]["fresh"] == 3
+
+            pipeline = mock_aggregate.call_args.args[0]
+            assert [pattern.pattern for pattern in pipeline[0]["$match"]["geohash"]["$in"]][0].startswith("^d3g6cq")
+            assert pipeline[-1]["$group"]["_id"] == {"$substrBytes": ["$geohash", 0, 7]}
+            threshold = pipeline[-1]["$group"]["stale"]["$sum"]["$cond"][0]["$and"][1]["$lt"][1]
+            assert timedelta(days=30) <= datetime.now(timezone.utc) - threshold < timedelta(days=30, minutes=1)
+
+
+@pytest.mark.asyncio
+async def test_tile_heatmap_default_precision():
+    with patch("app.database.heatmap_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=[])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/heatmap/tiles/10/301/385")
+            assert response.status_code == 200
+            assert response.json()["precision"] == 5
+            assert response.json()["data"] == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/heatmap/tiles/2/4/0",
+        "/heatmap/geohash?bbox=-180,-80,180,80&precision=6",
+        "/heatmap/geohash?bbox=1,2,3",
+        "/heatmap/geohash?bbox=0,0,1,1&precision=9",
+    ],
+)
+async def test_heatmap_rejects_invalid_areas(url):
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get(url)
+        assert response.status_code == 422
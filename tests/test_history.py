@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.main import app
+from app.routes.review_history_router import category_history_pipeline
+from app.utils.history import bucket_updates, month_start, months_back
+
+transport = httpx.ASGITransport(app=app)
+
+
+def test_month_start_and_window():
+    moment = datetime(2024, 3, 15, 10, 30, tzinfo=timezone(timedelta(hours=-5)))
+    assert month_start(moment) == datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert months_back(moment, 1) == datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert months_back(moment, 4) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+
+
+def test_bucket_updates_fold_events_per_month():
+    review_id = ObjectId()
+    first, second, third = datetime(2024, 3, 2), datetime(2024, 3, 20), datetime(2024, 4, 1)
+    updates = bucket_updates([(review_id, 3, second), (review_id, 3, first), (review_id, 3, third)])
+
+    assert [update._filter for update in updates] == [
+        {"review_id": review_id, "month": datetime(2024, 3, 1)},
+        {"review_id": review_id, "month": datetime(2024, 4, 1)},
+    ]
+    march = updates[0]._doc
+    assert march["$push"] == {"events": {"$each": [second, first]}}
+    assert march["$inc"] == {"count": 2}
+    assert (march["$min"], march["$max"]) == ({"first": first}, {"last": second})
+    assert march["$setOnInsert"] == {"category_id": 3}
+    assert all(update._upsert for update in updates)
+
+
+def test_category_history_pipeline_aggregates_buckets():
+    collection = mongomock.MongoClient().db.review_history
+    start = datetime(2024, 1, 10)
+    busy, quiet, other = ObjectId(), ObjectId(), ObjectId()
+    events = [(busy, 1, start + timedelta(days=days)) for days in (0, 10, 40)]
+    events += [(quiet, 1, start + timedelta(days=5)), (other, 2, start)]
+    collection.bulk_write(bucket_updates(events))
+
+    (totals,) = collection.aggregate(category_history_pipeline(1, datetime(2024, 1, 1)))
+    assert (totals["pairs"], totals["reviews"], totals["intervals"]) == (2, 4, 2)
+    assert totals["span_ms"] == timedelta(days=40) / timedelta(milliseconds=1)
+    assert (totals["first"], totals["last"]) == (start, start + timedelta(days=40))
+
+
+@pytest.mark.asyncio
+async def test_review_history():
+    location_id = ObjectId()
+    buckets = [
+        {"month": datetime(2024, 1, 1), "count": 2, "first": datetime(2024, 1, 3), "last": datetime(2024, 1, 13)},
+        {"month": datetime(2024, 2, 1), "count": 1, "first": datetime(2024, 2, 2), "last": datetime(2024, 2, 2)},
+    ]
+    with patch("app.database.history_collection.find") as mock_find, patch(
+        "app.database.reviews_collection.find_one", new_callable=AsyncMock
+    ) as mock_find_one:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=buckets)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get(f"/history/reviews/{location_id}", params={"months": 6})
+            assert response.status_code == 200
+            data = response.json()["data"][0]
+            assert data["_id"] == str(location_id)
+            assert data["reviews"] == 3
+            assert data["reviews_per_month"] == 0.5
+            assert data["average_interval_days"] == 15.0
+            assert [month["reviews"] for month in data["months"]] == [2, 1]
+
+            query = mock_find.call_args.args[0]
+            assert query["review_id"] == location_id
+            assert query["month"]["$gte"] == months_back(datetime.now(timezone.utc), 6)
+            assert mock_find.call_args.kwargs["sort"] == [("month", 1)]
+            mock_find_one.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_review_history_empty_and_missing():
+    with patch("app.database.history_collection.find") as mock_find, patch(
+        "app.database.reviews_collection.find_one", new_callable=AsyncMock
+    ) as mock_find_one:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=[])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            mock_find_one.return_value = {"_id": ObjectId()}
+            response = await client.get(f"/history/reviews/{ObjectId()}")
+            assert response.status_code == 200
+            assert response.json()["data"][0]["reviews"] == 0
+            assert response.json()["data"][0]["average_interval_days"] is None
+
+            mock_find_one.return_value = None
+            response = await client.get(f"/history/reviews/{ObjectId()}")
+            assert response.status_code == 404
+
+            response = await client.get("/history/reviews/not-an-id")
+            assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_category_history(known_categories):
+    totals = {
+        "_id": None,
+        "pairs": 2,
+        "reviews": 4,
+        "first": datetime(2024, 1, 10),
+        "last": datetime(2024, 2, 19),
+        "span_ms": 45 * 86_400_000,
+        "intervals": 2,
+    }
+    with patch("app.database.history_collection.aggregate") as mock_aggregate:
+        mock_aggregate.return_value = AsyncMock()
+        mock_aggregate.return_value.to_list = AsyncMock(return_value=[totals])
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/history/categories/Foo", params={"months": 2})
+            assert response.status_code == 200
+            data = response.json()["data"][0]
+            assert data["category"] == {"name": "Foo"}
+            assert (data["pairs"], data["reviews"], data["reviews_per_month"]) == (2, 4, 2.0)
+            assert data["average_interval_days"] == 22.5
+            assert mock_aggregate.call_args.args[0][0]["$match"]["category_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_category_history_unknown_category():
+    with patch("app.utils.categories.CategoryRegistry.find_id", new_callable=AsyncMock, return_value=None):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/history/categories/Unknown")
+            assert response.status_code == 404
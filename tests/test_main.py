@@ -0,0 +1,142 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from app import database
+from app.main import app, lifespan
+
+transport = httpx.ASGITransport(app=app)
+
+
+@pytest.mark.asyncio
+async def test_ready():
+    async def ping():
+        database.health.mark(True, latency_ms=1.5)
+        return True
+
+    with patch("app.database.ping", side_effect=ping):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["message"] == "Ready."
+            data = response.json()["data"][0]
+            assert data["database"]["available"] is True
+            assert data["database"]["latency_ms"] == 1.5
+            assert data["pool"]["max_pool_size"] == database.CLIENT_OPTIONS["maxPoolSize"]
+
+
+@pytest.mark.asyncio
+async def test_ready_database_unavailable():
+    async def ping():
+        database.health.mark(False, error="Connection refused")
+        return False
+
+    with patch("app.database.ping", side_effect=ping):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["status"] == "Error"
+            assert response.json()["data"][0]["database"]["error"] == "Connection refused"
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_database_fails_fast():
+    database.health.mark(False, error="Connection refused")
+
+    with patch("app.database.reviews_collection.find") as mock_find:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/")
+            assert response.status_code == 503
+            assert response.json()["detail"] == "Database connection not available."
+            mock_find.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_server_selection_timeout_marks_database_unavailable():
+    with patch("app.database.reviews_collection.find", side_effect=ServerSelectionTimeoutError("No servers")):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/")
+            assert response.status_code == 503
+            assert response.json()["detail"] == "No servers"
+
+    assert database.health.available is False
+    assert database.get_reviews_collection() is None
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_up_and_closes_client():
+    with patch("app.database.warm_up", new_callable=AsyncMock) as mock_warm_up, patch(
+        "app.database.ensure_indexes", new_callable=AsyncMock
+    ) as mock_ensure_indexes, patch(
+        "app.utils.categories.CategoryRegistry.load", new_callable=AsyncMock
+    ) as mock_load, patch(
+        "app.database.monitor_health", new_callable=AsyncMock
+    ), patch(
+        "app.database.client"
+    ) as mock_client:
+        async with lifespan(app):
+            mock_warm_up.assert_awaited_once()
+            mock_ensure_indexes.assert_awaited_once()
+            mock_load.assert_awaited_once()
+            assert database.health.available is True
+        mock_client.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_lifespan_starts_when_database_is_down():
+    with patch("app.database.warm_up", side_effect=ServerSelectionTimeoutError("No servers")), patch(
+        "app.database.monitor_health", new_callable=AsyncMock
+    ), patch("app.database.client"):
+        async with lifespan(app):
+            assert database.health.available is False
+            assert database.health.error == "No servers"
+
+
+@pytest.mark.asyncio
+async def test_ping_sets_up_database_that_was_down_at_startup():
+    database.health.mark(False, error="No servers")
+    with patch("app.database.client") as mock_client, patch(
+        "app.database.ensure_indexes", new_callable=AsyncMock, side_effect=[OperationFailure("not primary"), None]
+    ) as mock_ensure_indexes, patch("app.utils.categories.CategoryRegistry.load", new_callable=AsyncMock) as mock_load:
+        mock_client.admin.command = AsyncMock(return_value={"ok": 1})
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["data"][0]["database"]["initialized"] is False
+            assert database.get_reviews_collection() is None
+
+            response = await client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["data"][0]["database"]["initialized"] is True
+
+        assert await database.ping()
+        assert mock_ensure_indexes.await_count == 2
+        mock_load.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_gzipped():
+    reviews = [
+        {
+            "_id": f"{index:024x}",
+            "location": {"latitude": 10.0 + index / 100, "longitude": -74.0},
+            "category": {"name": "Foo"},
+            "last_reviewed": None,
+        }
+        for index in range(50)
+    ]
+    with patch("app.database.reviews_collection.find") as mock_find:
+        mock_find.return_value = AsyncMock()
+        mock_find.return_value.to_list = AsyncMock(return_value=reviews)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/exploration-recommendations/", params={"limit": 50})
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == "gzip"
+            assert len(response.json()["data"]) == 50
+
+            response = await client.get("/exploration-recommendations/cache")
+            assert "content-encoding" not in response.headers
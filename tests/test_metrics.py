@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from bson import ObjectId
+
+from app.main import app
+from app.utils.metrics import command_listener, current_request_timing, registry
+
+transport = httpx.ASGITransport(app=app)
+
+
+def sample(name, labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_route_latency_and_in_flight():
+    labels = {"method": "PATCH", "route": "/exploration-recommendations/", "status": "404"}
+    before = sample("http_request_duration_seconds_count", labels)
+
+    with patch("app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock, return_value=None):
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.patch(f"/exploration-recommendations/?location_id={ObjectId()}")
+            assert response.status_code == 404
+
+            response = await client.get("/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/plain")
+            assert 'http_request_duration_seconds_count{method="PATCH",route="/exploration-recommendations/"' in (
+                response.text
+            )
+            assert "recommendations_cache_hits_total" in response.text
+
+    assert sample("http_request_duration_seconds_count", labels) == before + 1
+    assert sample("http_requests_in_flight", {"method": "PATCH", "route": "/exploration-recommendations/"}) == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_unmatched_route():
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        await client.get(f"/not-a-route/{ObjectId()}")
+
+    assert sample("http_request_duration_seconds_count", {"method": "GET", "route": "unmatched", "status": "404"}) > 0
+
+
+def command_event(command_name, command=None, reply=None, duration_micros=2500):
+    return SimpleNamespace(
+        command_name=command_name,
+        command=command or {},
+        reply=reply or {},
+        connection_id=("localhost", 27017),
+        request_id=id(command),
+        duration_micros=duration_micros,
+    )
+
+
+@pytest.mark.parametrize(
+    "command_name, command, reply, documents",
+    [
+        ("find", {"find": "reviews"}, {"cursor": {"firstBatch": [{}, {}]}}, 2),
+        ("getMore", {"getMore": 1, "collection": "reviews"}, {"cursor": {"nextBatch": [{}]}}, 1),
+        ("insert", {"insert": "reviews"}, {"n": 3}, 3),
+        ("findAndModify", {"findAndModify": "reviews"}, {"value": None}, 0),
+    ],
+)
+def test_command_listener_records_duration_and_documents(command_name, command, reply, documents):
+    labels = {"command": command_name, "collection": "reviews"}
+    count_before = sample("mongodb_command_duration_seconds_count", labels)
+    documents_before = sample("mongodb_command_documents_total", labels)
+
+    event = command_event(command_name, command, reply)
+    command_listener.started(event)
+    command_listener.succeeded(event)
+
+    assert sample("mongodb_command_duration_seconds_count", labels) == count_before + 1
+    assert sample("mongodb_command_documents_total", labels) == documents_before + documents
+
+
+def test_command_listener_failures_and_request_timing():
+    labels = {"command": "aggregate", "collection": "reviews"}
+    failures_before = sample("mongodb_command_failures_total", labels)
+    timing = SimpleNamespace(mongodb_seconds=0.0)
+    token = current_request_timing.set(timing)
+
+    try:
+        event = command_event("aggregate", {"aggregate": "reviews"})
+        command_listener.started(event)
+        command_listener.failed(event)
+    finally:
+        current_request_timing.reset(token)
+
+    assert sample("mongodb_command_failures_total", labels) == failures_before + 1
+    assert timing.mongodb_seconds == 0.0025
@@ -0,0 +1,396 @@
+"""Query plan regression tests, run against the mongod at ``MONGO_URI`` and skipped when none answers.
+
+Every query the routers send during a request is explained with ``executionStats`` before it runs, so each
+plan sees the data the real command saw. A plan fails when it scans the collection, sorts documents it read
+from an index in memory, or examines many more documents than it returns. Documents returned are counted below
+the limit, by the stage the LIMIT reads from or else the FETCH, so a page of ten that reads a thousand fails.
+Pipelines that ``$group`` or ``$geoNear`` compare with the documents their filter matches instead: a group
+shrinks its output however selective the index is, and $geoNear reads whole cells around the radius.
+
+Set ``QUERY_PLAN_REPORT`` to a path to also write the keys and documents examined per endpoint as JSON.
+"""
+
+import json
+import os
+import random
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, NamedTuple, Optional
+
+import httpx
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+from app import database
+from app.database import (
+    CATEGORIES_INDEXES,
+    HISTORY_INDEXES,
+    REVIEW_KEY_INDEX,
+    REVIEWS_INDEXES,
+    get_heatmap_collection,
+    get_history_collection,
+    get_reviews_collection,
+)
+from app.main import app
+from app.models import Category, Location, LocationCategoryReviewCreate
+from app.utils.categories import CATEGORY_SEQUENCE, category_registry
+from app.utils.heatmap import MISSING, cell_updates
+from app.utils.history import bucket_updates
+from app.utils.pagination import encode_cursor
+from app.utils.streaming import NDJSON_MEDIA_TYPE
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DATABASE = "map_my_world_query_plans"
+REPORT_PATH = os.getenv("QUERY_PLAN_REPORT")
+ROWS = 4000
+CATEGORIES = 8
+# A dense area, so geo and heatmap queries have enough matches for their plans to matter.
+CLUSTER = (4.65, -74.08)
+CLUSTER_ROWS = 1000
+CLUSTER_SPREAD = 0.25
+HISTORY_REVIEWS = 1000
+# Radius $geoNear uses for spherical distances.
+EARTH_RADIUS_M = 6378100
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Stages whose input, not their own output, is what the plan returned.
+WRITE_STAGES = {"UPDATE", "DELETE"}
+# Pipelines measured against the documents they match rather than the documents they return.
+MATCHED_STAGES = ("$group", "$geoNear")
+STRIPPED_FIELDS = {"$db", "lsid", "$clusterTime", "txnNumber", "$readPreference", "readConcern", "writeConcern"}
+
+
+class Seeded(NamedTuple):
+    review_ids: list
+    stale_review: dict
+
+
+class Scenario(NamedTuple):
+    request: Callable[[Seeded], tuple]
+    # Documents examined per document returned; geo indexes read whole cells around the area asked for.
+    max_ratio: float = 1.5
+    # Set where the index can't provide the order and a limit or an ID list bounds what gets sorted.
+    bounded_sort: bool = False
+
+
+def cluster_bbox(margin: float = 0.3) -> str:
+    lat, lon = CLUSTER
+    return f"{lon - margin},{lat - margin},{lon + margin},{lat + margin}"
+
+
+SCENARIOS = {
+    "recommendations": Scenario(lambda seeded: ("GET", "/exploration-recommendations/", {})),
+    "recommendations_next_page": Scenario(
+        lambda seeded: (
+            "GET",
+            "/exploration-recommendations/",
+            {"params": {"cursor": encode_cursor(seeded.stale_review)}},
+        )
+    ),
+    "recommendations_category": Scenario(
+        lambda seeded: ("GET", "/exploration-recommendations/", {"params": {"category": "Category 1"}})
+    ),
+    "recommendations_bbox": Scenario(
+        lambda seeded: ("GET", "/exploration-recommendations/", {"params": {"bbox": cluster_bbox()}}),
+        max_ratio=3,
+        bounded_sort=True,
+    ),
+    "recommendations_diverse": Scenario(
+        lambda seeded: ("GET", "/exploration-recommendations/", {"params": {"diverse": "true"}})
+    ),
+    "recommendations_stream": Scenario(
+        lambda seeded: ("GET", "/exploration-recommendations/", {"headers": {"Accept": NDJSON_MEDIA_TYPE}})
+    ),
+    "nearby_recommendations": Scenario(
+        lambda seeded: (
+            "GET",
+            "/exploration-recommendations/nearby",
+            {"params": {"lat": CLUSTER[0], "lon": CLUSTER[1], "radius_m": 20_000}},
+        ),
+        max_ratio=3,
+    ),
+    "claim_recommendations": Scenario(
+        lambda seeded: ("POST", "/exploration-recommendations/claim", {"params": {"count": 5}}), bounded_sort=True
+    ),
+    "update_review": Scenario(
+        lambda seeded: (
+            "PATCH",
+            "/exploration-recommendations/",
+            {"params": {"location_id": str(seeded.review_ids[0])}},
+        )
+    ),
+    "bulk_update_review": Scenario(
+        lambda seeded: (
+            "PATCH",
+            "/exploration-recommendations/bulk",
+            {"json": [{"location_id": str(_id)} for _id in seeded.review_ids[1:21]]},
+        )
+    ),
+    "create_review": Scenario(
+        lambda seeded: (
+            "POST",
+            "/review/",
+            {"json": {"location": {"latitude": 1.5, "longitude": 2.5}, "category": {"name": "Category 2"}}},
+        )
+    ),
+    "review_history": Scenario(lambda seeded: ("GET", f"/history/reviews/{seeded.review_ids[0]}", {})),
+    "category_history": Scenario(lambda seeded: ("GET", "/history/categories/Category 1", {})),
+    "heatmap_materialized": Scenario(
+        lambda seeded: ("GET", "/heatmap/geohash", {"params": {"bbox": cluster_bbox(), "precision": 5}})
+    ),
+    "heatmap_live": Scenario(
+        lambda seeded: ("GET", "/heatmap/geohash", {"params": {"bbox": cluster_bbox(), "precision": 3}})
+    ),
+}
+
+
+def walk(node) -> Iterator[dict]:
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value)
+
+
+def winning_plans(explain: dict) -> list:
+    # Aggregations report their plan under the first stage, or at the top when the whole pipeline is pushed down.
+    return [node["queryPlanner"]["winningPlan"] for node in walk(explain) if "queryPlanner" in node]
+
+
+def plan_stages(plan: dict) -> list:
+    return [
+        f"{node['stage']}({node['indexName']})" if "indexName" in node else node["stage"]
+        for node in walk(plan)
+        if "stage" in node
+    ]
+
+
+def blocking_sorts(plan: dict) -> list:
+    # Sorting the output of a $group pushed into the plan is fine; sorting what the scan returned is not.
+    return [
+        node
+        for node in walk(plan)
+        if node.get("stage") == "SORT" and not any(child.get("stage") == "GROUP" for child in walk(node))
+    ]
+
+
+def query_filter(command_name: str, command: dict) -> Optional[dict]:
+    if command_name in ("find", "count", "distinct"):
+        return command.get("filter", command.get("query", {}))
+    if command_name == "findAndModify":
+        return command.get("query", {})
+    if command_name in ("update", "delete"):
+        return command[f"{command_name}s"][0]["q"]
+    first = command["pipeline"][0] if command.get("pipeline") else {}
+    if "$match" in first:
+        return first["$match"]
+    if "$geoNear" in first:
+        near = first["$geoNear"]
+        within = {"$centerSphere": [near["near"]["coordinates"], near["maxDistance"] / EARTH_RADIUS_M]}
+        return {"$and": [near.get("query", {}), {near["key"]: {"$geoWithin": within}}]}
+    return None
+
+
+def returned_documents(stages: dict) -> int:
+    """Documents an executionStages tree produced before any limit: the LIMIT input, else the FETCH output."""
+    nodes = list(walk(stages))
+    for node in nodes:
+        if node.get("stage") == "LIMIT" and "inputStage" in node:
+            return node["inputStage"].get("nReturned", 0)
+    for node in nodes:
+        if node.get("stage") == "FETCH":
+            return node.get("nReturned", 0)
+    while stages.get("stage") in WRITE_STAGES and "inputStage" in stages:
+        stages = stages["inputStage"]
+    return stages.get("nReturned", 0)
+
+
+def counts_matched(command_name: str, command: dict) -> bool:
+    if command_name != "aggregate":
+        return False
+    return any(name in stage for stage in walk(command.get("pipeline", [])) for name in MATCHED_STAGES)
+
+
+def explained_commands(command_name: str, command: dict) -> Iterator[dict]:
+    command = {key: value for key, value in command.items() if key not in STRIPPED_FIELDS}
+    if command_name in ("update", "delete"):
+        # explain takes a single write statement.
+        for statement in command[f"{command_name}s"]:
+            yield {**command, f"{command_name}s": [statement]}
+    else:
+        yield command
+
+
+class PlanCapture(monitoring.CommandListener):
+    """Explain each query on ``db`` as it is sent, before a write can change what it matches."""
+
+    def __init__(self, db):
+        self.db = db
+        self.plans = []
+
+    def started(self, event):
+        if event.database_name != self.db.name or event.command_name not in EXPLAINABLE:
+            return
+        for command in explained_commands(event.command_name, event.command):
+            collection = command[event.command_name]
+            entry = {"command": event.command_name, "collection": collection}
+            try:
+                explain = self.db.command("explain", command, verbosity="executionStats")
+                matched_filter = query_filter(event.command_name, command)
+                counted = matched_filter is not None and counts_matched(event.command_name, command)
+                stats = [node["executionStats"] for node in walk(explain) if "executionStats" in node]
+                plans = winning_plans(explain)
+                entry.update(
+                    stages=[stage for plan in plans for stage in plan_stages(plan)],
+                    blocking_sorts=sum(len(blocking_sorts(plan)) for plan in plans),
+                    keys_examined=sum(stat.get("totalKeysExamined", 0) for stat in stats),
+                    docs_examined=sum(stat.get("totalDocsExamined", 0) for stat in stats),
+                    returned=sum(
+                        returned_documents(stat["executionStages"]) for stat in stats if "executionStages" in stat
+                    ),
+                    matched=self.db[collection].count_documents(matched_filter) if counted else None,
+                    filtered=bool(matched_filter),
+                )
+            except PyMongoError as e:
+                entry["error"] = str(e)
+            self.plans.append(entry)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def random_last_reviewed(rng: random.Random, now: datetime):
+    draw = rng.random()
+    if draw < 0.2:
+        return None
+    return now - timedelta(days=rng.uniform(31, 365) if draw < 0.6 else rng.uniform(0, 29))
+
+
+def seed(db, rng: random.Random) -> Seeded:
+    now = datetime.now(timezone.utc)
+    db.categories.insert_many([{"_id": index + 1, "name": f"Category {index}"} for index in range(CATEGORIES)])
+    db.counters.insert_one({"_id": CATEGORY_SEQUENCE, "seq": CATEGORIES})
+    documents = []
+    for index in range(ROWS + CLUSTER_ROWS):
+        if index < CLUSTER_ROWS:
+            latitude = CLUSTER[0] + rng.uniform(-CLUSTER_SPREAD, CLUSTER_SPREAD)
+            longitude = CLUSTER[1] + rng.uniform(-CLUSTER_SPREAD, CLUSTER_SPREAD)
+        else:
+            latitude, longitude = rng.uniform(-60, 60), rng.uniform(-180, 180)
+        category_id = rng.randrange(CATEGORIES) + 1
+        review = LocationCategoryReviewCreate(
+            location=Location(latitude=latitude, longitude=longitude),
+            category=Category(name=f"Category {category_id - 1}"),
+        )
+        documents.append({**review.to_document(category_id), "last_reviewed": random_last_reviewed(rng, now)})
+    db.location_category_reviews.insert_many(documents)
+    db.heatmap_cells.bulk_write(
+        cell_updates((document["geohash"], MISSING, document["last_reviewed"]) for document in documents)
+    )
+    reviewed = [document for document in documents if document["last_reviewed"] is not None][:HISTORY_REVIEWS]
+    db.review_history.bulk_write(
+        bucket_updates(
+            (document["_id"], document["category_id"], document["last_reviewed"] - timedelta(days=20 * step))
+            for document in reviewed
+            for step in range(3)
+        )
+    )
+    rng.shuffle(documents)
+    stale = next(
+        document
+        for document in documents
+        if document["last_reviewed"] and document["last_reviewed"] < now - timedelta(days=60)
+    )
+    return Seeded([document["_id"] for document in documents], stale)
+
+
+@pytest.fixture(scope="module")
+def plan_db():
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"Query plan tests need a MongoDB server at {MONGO_URI}.")
+    client.drop_database(DATABASE)
+    db = client[DATABASE]
+    db.location_category_reviews.create_indexes([*REVIEWS_INDEXES, REVIEW_KEY_INDEX])
+    db.categories.create_indexes(CATEGORIES_INDEXES)
+    db.review_history.create_indexes(HISTORY_INDEXES)
+    yield db
+    client.drop_database(DATABASE)
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def seeded(plan_db):
+    return seed(plan_db, random.Random(19))
+
+
+@pytest.fixture(scope="module")
+def plan_report(plan_db):
+    endpoints = {}
+    yield endpoints
+    if REPORT_PATH:
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "server_version": plan_db.client.server_info()["version"],
+            "rows": ROWS + CLUSTER_ROWS,
+            "endpoints": endpoints,
+        }
+        with open(REPORT_PATH, "w") as stream:
+            json.dump(report, stream, indent=2)
+
+
+@asynccontextmanager
+async def captured_app(plan_db):
+    capture = PlanCapture(plan_db)
+    client = AsyncIOMotorClient(MONGO_URI, event_listeners=[capture])
+    db = client[DATABASE]
+    app.dependency_overrides[get_reviews_collection] = lambda: db.location_category_reviews
+    app.dependency_overrides[get_heatmap_collection] = lambda: db.heatmap_cells
+    app.dependency_overrides[get_history_collection] = lambda: db.review_history
+    category_registry.bind(db.categories, db.counters)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+            yield http, capture
+    finally:
+        app.dependency_overrides.pop(get_reviews_collection, None)
+        app.dependency_overrides.pop(get_heatmap_collection, None)
+        app.dependency_overrides.pop(get_history_collection, None)
+        category_registry.bind(database.categories_collection, database.counters_collection)
+        client.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", SCENARIOS)
+async def test_query_plans(name, plan_db, seeded, plan_report):
+    scenario = SCENARIOS[name]
+    method, url, kwargs = scenario.request(seeded)
+    async with captured_app(plan_db) as (http, capture):
+        response = await http.request(method, url, **kwargs)
+        assert response.status_code < 400, response.text
+
+    plans = capture.plans
+    plan_report[name] = {
+        "keys_examined": sum(plan.get("keys_examined", 0) for plan in plans),
+        "docs_examined": sum(plan.get("docs_examined", 0) for plan in plans),
+        "commands": plans,
+    }
+    assert plans, f"{name} sent no queries"
+    for plan in plans:
+        where = f"{name}: {plan['command']} on {plan['collection']} ({plan.get('stages')})"
+        assert "error" not in plan, f"{where}: {plan.get('error')}"
+        # A filterless read of the whole collection is a scan on purpose.
+        assert not plan["filtered"] or "COLLSCAN" not in plan["stages"], f"{where} scans the collection"
+        assert scenario.bounded_sort or not plan["blocking_sorts"], f"{where} sorts in memory"
+        expected = plan["returned"] if plan["matched"] is None else plan["matched"]
+        allowed = scenario.max_ratio * max(expected, 1)
+        assert plan["docs_examined"] <= allowed, f"{where} examined {plan['docs_examined']} for {expected}"
@@ -1,49 +1,141 @@
+import json
 from unittest.mock import AsyncMock, patch
 
 import httpx
 import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from app.main import app
 from app.models import Category, Location, LocationCategoryReviewCreate
+from app.utils.cache import recommendations_cache
 from app.utils.enums import StatusEnum
 
 transport = httpx.ASGITransport(app=app)
 
+pytestmark = pytest.mark.usefixtures("known_categories")
+
+
+@pytest.fixture(autouse=True)
+def heatmap_writes():
+    with patch("app.database.heatmap_collection.bulk_write", new_callable=AsyncMock) as mock_bulk_write:
+        yield mock_bulk_write
+
+
+def upserted_review(query, update, **kwargs):
+    document = update["$setOnInsert"]
+    return {key: document[key] for key in ("_id", "location", "category_id")}
+
 
 @pytest.mark.asyncio
 async def test_create_location_with_tag_success():
     location_data = LocationCategoryReviewCreate(
         location=Location(**{"latitude": 10.36288, "longitude": -74.119442}), category=Category(name="Test Category")
     )
-    mock_inserted_id = "60f71876f0656d240846c124"
-
-    # Mock de `insert_one` y `find_one`
-    with patch("app.database.reviews_collection.insert_one", new_callable=AsyncMock) as mock_insert_one, patch(
-        "app.database.reviews_collection.find_one", new_callable=AsyncMock
-    ) as mock_find_one:
-        mock_insert_one.return_value.inserted_id = mock_inserted_id
-        mock_find_one.return_value = {
-            "_id": mock_inserted_id,
-            "location": {"latitude": 10.36288, "longitude": -74.119442},
-            "category": {"name": "Test Category"},
-            "last_reviewed": None,
-        }
+
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.side_effect = upserted_review
 
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
             response = await client.post("/review/", json=location_data.to_json())
             assert response.status_code == 200
+            query, update = mock_find_one_and_update.call_args.args
             assert response.json() == {
                 "status": StatusEnum.SUCCESS,
                 "message": "Location category review added successfully",
                 "data": [
                     {
-                        "_id": mock_inserted_id,
+                        "_id": str(update["$setOnInsert"]["_id"]),
                         "location": {"latitude": 10.36288, "longitude": -74.119442},
                         "category": {"name": "Test Category"},
                         "last_reviewed": None,
                     }
                 ],
             }
+            assert recommendations_cache.stats()["size"] == 0
+            assert query == {"location.latitude": 10.36288, "location.longitude": -74.119442, "category_id": 1}
+            assert "category" not in update["$setOnInsert"]
+            assert update["$setOnInsert"]["geo"] == {"type": "Point", "coordinates": [-74.119442, 10.36288]}
+            assert mock_find_one_and_update.call_args.kwargs["upsert"] is True
+
+
+@pytest.mark.asyncio
+async def test_create_location_with_tag_updates_heatmap(heatmap_writes):
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.side_effect = upserted_review
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post(
+                "/review/",
+                json={"location": {"latitude": 57.64911, "longitude": 10.40744}, "category": {"name": "Foo"}},
+            )
+            assert response.status_code == 200
+            assert mock_find_one_and_update.call_args.args[1]["$setOnInsert"]["geohash"] == "u4pruydqqvj8"
+            operations = heatmap_writes.call_args.args[0]
+            assert [operation._filter for operation in operations] == [
+                {"_id": "4:u4pr"},
+                {"_id": "5:u4pru"},
+                {"_id": "6:u4pruy"},
+            ]
+            assert operations[0]._doc["$inc"] == {"never": 1}
+
+
+@pytest.mark.asyncio
+async def test_create_location_with_tag_existing_review():
+    existing = {
+        "_id": "60f71876f0656d240846c124",
+        "location": {"latitude": 10.36288, "longitude": -74.119442},
+        "category": {"name": "Test Category"},
+        "last_reviewed": None,
+    }
+
+    with patch("app.utils.cache.AsyncTTLCache.invalidate") as mock_invalidate, patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.return_value = existing
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post(
+                "/review/",
+                json={
+                    "location": {"latitude": 10.3628800004, "longitude": -74.119442},
+                    "category": {"name": "  Test Category "},
+                },
+            )
+            assert response.status_code == 200
+            assert response.json()["message"] == "Location category review already exists"
+            assert response.json()["data"] == [existing]
+            assert mock_find_one_and_update.call_args.args[0] == {
+                "location.latitude": 10.36288,
+                "location.longitude": -74.119442,
+                "category_id": 1,
+            }
+            mock_invalidate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_location_with_tag_retries_duplicate_key():
+    existing = {
+        "_id": "60f71876f0656d240846c124",
+        "location": {"latitude": 10.36288, "longitude": -74.119442},
+        "category": {"name": "Test Category"},
+    }
+
+    with patch(
+        "app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock
+    ) as mock_find_one_and_update:
+        mock_find_one_and_update.side_effect = [DuplicateKeyError("duplicate key"), existing]
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post(
+                "/review/", json={"location": existing["location"], "category": existing["category"]}
+            )
+            assert response.status_code == 200
+            assert response.json()["data"][0]["_id"] == existing["_id"]
+            assert mock_find_one_and_update.await_count == 2
 
 
 @pytest.mark.asyncio
@@ -63,9 +155,9 @@ async def test_create_location_with_tag_connection_error():
         location=Location(**{"latitude": 10.36288, "longitude": -74.119442}), category=Category(name="Test Category")
     )
 
-    # Mock de `insert_one` para lanzar un `ConnectionError`
-    with patch("app.database.reviews_collection.insert_one", new_callable=AsyncMock) as mock_insert_one:
-        mock_insert_one.side_effect = ConnectionError("Database connection error")
+    # Mock de `find_one_and_update` para lanzar un `ConnectionError`
+    with patch("app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock) as mock_upsert:
+        mock_upsert.side_effect = ConnectionError("Database connection error")
 
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
             response = await client.post("/review/", json=location_data.to_json())
@@ -79,9 +171,9 @@ async def test_create_location_with_tag_unexpected_error():
         location=Location(**{"latitude": 10.36288, "longitude": -74.119442}), category=Category(name="Test Category")
     )
 
-    # Mock de `insert_one` para lanzar una excepción genérica
-    with patch("app.database.reviews_collection.insert_one", new_callable=AsyncMock) as mock_insert_one:
-        mock_insert_one.side_effect = Exception("Unexpected error")
+    # Mock de `find_one_and_update` para lanzar una excepción genérica
+    with patch("app.database.reviews_collection.find_one_and_update", new_callable=AsyncMock) as mock_upsert:
+        mock_upsert.side_effect = Exception("Unexpected error")
 
         async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
             response = await client.post("/review/", json=location_data.to_json())
@@ -101,3 +193,145 @@ async def test_create_location_with_tag_out_of_range_location():
         assert response.status_code == 422
         assert "detail" in response.json()
         assert response.json()["detail"][0]["msg"] == "Input should be less than or equal to 90"
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_json_array():
+    rows = [
+        {"location": {"latitude": 10.36288, "longitude": -74.119442}, "category": {"name": "Foo"}},
+        {"category": {"name": "Missing location"}},
+        {"location": {"latitude": 12.34, "longitude": -56.78}, "category": {"name": "Bar"}},
+    ]
+
+    with patch("app.database.reviews_collection.insert_many", new_callable=AsyncMock) as mock_insert_many:
+        mock_insert_many.return_value.inserted_ids = ["a", "b"]
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/review/bulk", json=rows)
+            assert response.status_code == 200
+            assert response.json()["status"] == StatusEnum.SUCCESS
+            assert response.json()["message"] == "Bulk ingestion processed 3 rows (2 inserted)."
+            assert response.json()["data"] == [
+                {"batch": 0, "received": 3, "inserted": 2, "errors": [{"row": 1, "detail": "location: Field required"}]}
+            ]
+
+            documents = mock_insert_many.call_args.args[0]
+            assert [document["category_id"] for document in documents] == [2, 3]
+            assert documents[0]["geo"] == {"type": "Point", "coordinates": [-74.119442, 10.36288]}
+            assert mock_insert_many.call_args.kwargs["ordered"] is False
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_ndjson_batches():
+    lines = [
+        json.dumps({"location": {"latitude": float(i), "longitude": float(i)}, "category": {"name": "Foo"}})
+        for i in range(3)
+    ]
+    body = "\n".join(lines[:2] + ["{not json"] + lines[2:]) + "\n"
+
+    with patch("app.routes.review_locations_router.BULK_BATCH_SIZE", 2), patch(
+        "app.database.reviews_collection.insert_many", new_callable=AsyncMock
+    ) as mock_insert_many:
+        mock_insert_many.side_effect = [
+            AsyncMock(inserted_ids=["a", "b"]),
+            AsyncMock(inserted_ids=["c"]),
+        ]
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/review/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+            assert response.status_code == 200
+            assert response.json()["message"] == "Bulk ingestion processed 4 rows (3 inserted)."
+            assert response.json()["data"] == [
+                {"batch": 0, "received": 2, "inserted": 2, "errors": []},
+                {
+                    "batch": 1,
+                    "received": 2,
+                    "inserted": 1,
+                    "errors": [{"row": 2, "detail": "Invalid JSON: Expecting property name enclosed in double quotes"}],
+                },
+            ]
+            assert mock_insert_many.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_write_errors(heatmap_writes):
+    rows = [
+        {"location": {"latitude": 1.0, "longitude": 1.0}, "category": {"name": "Foo"}},
+        {"location": {"latitude": 2.0, "longitude": 2.0}, "category": {"name": "Bar"}},
+    ]
+
+    with patch("app.database.reviews_collection.insert_many", new_callable=AsyncMock) as mock_insert_many:
+        mock_insert_many.side_effect = BulkWriteError(
+            {"nInserted": 1, "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]}
+        )
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/review/bulk", json=rows)
+            assert response.status_code == 200
+            assert response.json()["data"] == [
+                {
+                    "batch": 0,
+                    "received": 2,
+                    "inserted": 1,
+                    "errors": [{"row": 1, "detail": "A review for this location and category already exists."}],
+                }
+            ]
+            # Only the inserted row is counted in the heatmap.
+            cells = [operation._filter["_id"] for operation in heatmap_writes.call_args.args[0]]
+            assert cells == ["4:s00t", "5:s00tw", "6:s00twy"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_malformed_array():
+    body = '[{"location": {"latitude": 1.0, "longitude": 1.0}, "category": {"name": "Foo"}} {"oops": 1}]'
+
+    with patch("app.routes.review_locations_router.BULK_BATCH_SIZE", 1), patch(
+        "app.database.reviews_collection.insert_many", new_callable=AsyncMock
+    ) as mock_insert_many:
+        mock_insert_many.return_value.inserted_ids = ["a"]
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/review/bulk", content=body, headers={"Content-Type": "application/json"})
+            # The first row was already written in its own batch, so the partial result is reported.
+            assert response.status_code == 200
+            assert response.json()["status"] == StatusEnum.ERROR
+            assert response.json()["message"] == (
+                "Bulk ingestion stopped at row 1 (1 inserted): Expected ',' or ']' between JSON array elements."
+            )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body, detail",
+    [
+        ("", "Bulk ingestion stopped at row 0: Expected a JSON array or an NDJSON body."),
+        (
+            '{"location": {}}',
+            "Bulk ingestion stopped at row 0: Expected a JSON array or an NDJSON body.",
+        ),
+        (
+            '[{"location": {"latitude": 1.0, "longitude": 1.0}, "category": {"name": "Foo"}} {"oops": 1}]',
+            "Bulk ingestion stopped at row 1: Expected ',' or ']' between JSON array elements.",
+        ),
+    ],
+)
+async def test_bulk_create_rejects_malformed_body(body, detail):
+    with patch("app.database.reviews_collection.insert_many", new_callable=AsyncMock) as mock_insert_many:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/review/bulk", content=body, headers={"Content-Type": "application/json"})
+            assert response.status_code == 422
+            assert response.json() == {"detail": detail}
+            mock_insert_many.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_connection_error():
+    rows = [{"location": {"latitude": 1.0, "longitude": 1.0}, "category": {"name": "Foo"}}]
+
+    with patch("app.database.reviews_collection.insert_many", new_callable=AsyncMock) as mock_insert_many:
+        mock_insert_many.side_effect = ConnectionError("Database connection error")
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/review/bulk", json=rows)
+            assert response.status_code == 503
+            assert response.json() == {"detail": "Database connection error"}
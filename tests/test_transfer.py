@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.manage import export_reviews, import_reviews, validate_chunk
+from app.utils.transfer import Checkpoint, detect_format, iter_csv, iter_ndjson_lines
+
+pytestmark = pytest.mark.usefixtures("known_categories")
+
+
+class MockCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for document in self.documents:
+            yield document
+
+
+@pytest.fixture(autouse=True)
+def loaded_registry():
+    with patch("app.utils.categories.CategoryRegistry.load", new_callable=AsyncMock):
+        yield
+
+
+def bulk_result(operations, **kwargs):
+    return MagicMock(upserted_count=len(operations), matched_count=0)
+
+
+def test_detect_format():
+    assert detect_format("reviews.CSV") == "csv"
+    assert detect_format("reviews.jsonl") == "ndjson"
+    assert detect_format("reviews.txt", "ndjson") == "ndjson"
+    with pytest.raises(ValueError):
+        detect_format("reviews.txt")
+
+
+def test_validate_chunk_csv_and_ndjson_rows():
+    rows = list(
+        iter_csv(io.StringIO("latitude,longitude,category,last_reviewed\n10.5,-74.1,Foo,2024-05-01T10:00:00\n"))
+    )
+    rows += list(
+        iter_ndjson_lines(
+            io.StringIO('{"location": {"latitude": 91, "longitude": 0}, "category": {"name": "Foo"}}\n\n[1]\n{oops\n')
+        )
+    )
+    entries, errors = validate_chunk(rows, first_row=10)
+
+    ((review, last_reviewed, row),) = entries
+    assert (review.location.latitude, review.category.name, row) == (10.5, "Foo", 10)
+    assert last_reviewed == datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    assert [error["row"] for error in errors] == [11, 12, 13]
+    assert errors[0]["detail"].startswith("location.latitude:")
+    assert errors[1]["detail"] == "Each row must be a JSON object."
+    assert errors[2]["detail"].startswith("Invalid JSON")
+
+
+def test_checkpoint_keeps_contiguous_prefix(tmp_path):
+    path = str(tmp_path / "import.checkpoint")
+    checkpoint = Checkpoint(path, "/data/reviews.csv")
+    checkpoint.finish(2, 2, {"inserted": 2, "existing": 0, "errors": 0})
+    assert checkpoint.rows == 0
+    checkpoint.finish(0, 2, {"inserted": 1, "existing": 1, "errors": 0})
+    assert checkpoint.rows == 4
+
+    resumed = Checkpoint(path, "/data/reviews.csv").load()
+    assert (resumed.rows, resumed.counts) == (4, {"inserted": 3, "existing": 1, "errors": 0})
+    with pytest.raises(ValueError):
+        Checkpoint(path, "/data/other.csv").load()
+
+
+@pytest.mark.asyncio
+async def test_import_reviews_upsert_resumes_from_checkpoint(tmp_path):
+    source = tmp_path / "reviews.csv"
+    source.write_text(
+        "latitude,longitude,category,last_reviewed\n"
+        "1,1,Foo,\n"
+        "2,2,Bar,2024-01-01T00:00:00Z\n"
+        "3,abc,Foo,\n"
+        "4,4,Test Category,\n"
+        "5,5,Foo,\n"
+    )
+    checkpoint = str(tmp_path / "reviews.checkpoint")
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock(side_effect=bulk_result)
+
+    await import_reviews(
+        str(source), chunk_size=2, workers=2, checkpoint=checkpoint, skip_heatmap=True, collection=collection
+    )
+
+    operations = [operation for call in collection.bulk_write.call_args_list for operation in call.args[0]]
+    assert len(operations) == 4
+    assert all(operation._upsert for operation in operations)
+    by_latitude = {operation._filter["location.latitude"]: operation._doc for operation in operations}
+    assert by_latitude[2.0]["$max"] == {"last_reviewed": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+    assert "$max" not in by_latitude[1.0]
+    assert by_latitude[4.0]["$setOnInsert"]["category_id"] == 1
+    with open(checkpoint) as stream:
+        assert json.load(stream)["counts"] == {"inserted": 4, "existing": 0, "errors": 1}
+
+    collection.bulk_write.reset_mock()
+    await import_reviews(
+        str(source), chunk_size=2, workers=2, checkpoint=checkpoint, skip_heatmap=True, collection=collection
+    )
+    collection.bulk_write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_import_reviews_insert_counts_existing_keys(tmp_path):
+    source = tmp_path / "reviews.ndjson"
+    source.write_text(
+        "\n".join(
+            json.dumps({"location": {"latitude": index, "longitude": index}, "category": {"name": "Foo"}})
+            for index in range(3)
+        )
+    )
+    checkpoint = str(tmp_path / "reviews.checkpoint")
+    collection = MagicMock()
+    collection.insert_many = AsyncMock(
+        side_effect=BulkWriteError(
+            {
+                "nInserted": 1,
+                "writeErrors": [
+                    {"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"},
+                    {"index": 2, "code": 121, "errmsg": "Document failed validation"},
+                ],
+            }
+        )
+    )
+
+    await import_reviews(str(source), mode="insert", checkpoint=checkpoint, skip_heatmap=True, collection=collection)
+
+    documents = collection.insert_many.call_args.args[0]
+    assert [document["location"]["latitude"] for document in documents] == [0, 1, 2]
+    assert "last_reviewed" not in documents[0]
+    with open(checkpoint) as stream:
+        assert json.load(stream)["counts"] == {"inserted": 1, "existing": 1, "errors": 1}
+
+
+@pytest.mark.asyncio
+async def test_export_reviews(tmp_path):
+    reviews = [
+        {
+            "_id": ObjectId(),
+            "location": {"latitude": 10.5, "longitude": -74.1},
+            "category_id": 2,
+            "last_reviewed": datetime(2024, 5, 1, 10),
+        },
+        {"_id": ObjectId(), "location": {"latitude": 1.0, "longitude": 2.0}, "category_id": 3},
+    ]
+    collection = MagicMock()
+    collection.find.return_value = MockCursor(reviews)
+
+    await export_reviews(str(tmp_path / "reviews.csv"), batch_size=1, category="Foo", collection=collection)
+    with open(tmp_path / "reviews.csv", newline="") as stream:
+        rows = list(csv.DictReader(stream))
+    assert collection.find.call_args.args[0] == {"category_id": 2}
+    assert collection.find.call_args.kwargs["batch_size"] == 1
+    assert rows[0] == {
+        "_id": str(reviews[0]["_id"]),
+        "latitude": "10.5",
+        "longitude": "-74.1",
+        "category": "Foo",
+        "last_reviewed": "2024-05-01T10:00:00",
+    }
+    assert rows[1]["category"] == "Bar" and rows[1]["last_reviewed"] == ""
+
+    collection.find.return_value = MockCursor(reviews)
+    await export_reviews(str(tmp_path / "reviews.ndjson"), collection=collection)
+    with open(tmp_path / "reviews.ndjson") as stream:
+        lines = [json.loads(line) for line in stream]
+    assert collection.find.call_args.args[0] == {}
+    assert lines[1] == {
+        "_id": str(reviews[1]["_id"]),
+        "location": {"latitude": 1.0, "longitude": 2.0},
+        "category": {"name": "Bar"},
+        "last_reviewed": None,
+    }
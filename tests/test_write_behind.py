@@ -0,0 +1,194 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from bson import ObjectId
+
+from app.main import app
+from app.routes.exploration_recommender_router import update_queue
+from app.routes.review_locations_router import create_queue
+from app.utils.write_behind import WriteBehindQueue, WriteQueueFull
+
+transport = httpx.ASGITransport(app=app)
+
+
+@pytest.mark.asyncio
+async def test_queue_batches_and_resolves_each_caller():
+    batches = []
+
+    async def flush(items):
+        batches.append(list(items))
+        return [ValueError(item) if item == 3 else item * 10 for item in items]
+
+    queue = WriteBehindQueue("test", flush, max_batch=3, max_delay=0.05)
+    queue.start()
+    try:
+        results = await asyncio.gather(*(queue.submit(item) for item in range(5)), return_exceptions=True)
+    finally:
+        await queue.stop()
+
+    assert [len(batch) for batch in batches] == [3, 2]
+    assert results[:3] == [0, 10, 20] and results[4] == 40
+    assert isinstance(results[3], ValueError)
+    assert queue.stats() == {"running": False, "pending": 0, "batches": 2, "items": 5}
+
+
+@pytest.mark.asyncio
+async def test_queue_failed_flush_fails_whole_batch():
+    queue = WriteBehindQueue("test", AsyncMock(side_effect=ConnectionError("down")), max_delay=0)
+    queue.start()
+    try:
+        with pytest.raises(ConnectionError):
+            await queue.submit("item")
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_queue_backpressure_when_full():
+    release = asyncio.Event()
+
+    async def flush(items):
+        await release.wait()
+        return items
+
+    queue = WriteBehindQueue("test", flush, max_batch=1, max_delay=0, max_size=1, put_timeout=0.01)
+    queue.start()
+    first = asyncio.create_task(queue.submit(1))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(queue.submit(2))
+    await asyncio.sleep(0)
+    with pytest.raises(WriteQueueFull):
+        await queue.submit(3)
+
+    release.set()
+    assert await first == 1 and await second == 2
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_queue_stop_flushes_pending_writes():
+    flushed = []
+
+    async def flush(items):
+        flushed.extend(items)
+        return items
+
+    queue = WriteBehindQueue("test", flush, max_batch=100, max_delay=10)
+    queue.start()
+    pending = [asyncio.create_task(queue.submit(item)) for item in range(3)]
+    await asyncio.sleep(0)
+    await queue.stop()
+
+    assert flushed == [0, 1, 2]
+    assert [task.result() for task in pending] == [0, 1, 2]
+    with pytest.raises(RuntimeError):
+        await queue.submit(4)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("known_categories")
+async def test_create_review_write_behind():
+    existing_id = ObjectId()
+    existing = {"_id": existing_id, "location": {"latitude": 1.0, "longitude": 2.0}, "category_id": 2}
+    create_queue.start()
+    try:
+        # Both requests always share one batch, however the event loop schedules them.
+        with patch.object(create_queue, "max_batch", 2), patch.object(create_queue, "max_delay", 5), patch(
+            "app.database.reviews_collection.bulk_write", new_callable=AsyncMock
+        ) as mock_bulk_write, patch("app.database.reviews_collection.find") as mock_find, patch(
+            "app.database.heatmap_collection.bulk_write", new_callable=AsyncMock
+        ) as heatmap_writes:
+            mock_bulk_write.side_effect = lambda operations, **kwargs: MagicMock(
+                upserted_ids={
+                    index: operation._doc["$setOnInsert"]["_id"]
+                    for index, operation in enumerate(operations)
+                    if operation._filter["location.latitude"] != 1.0
+                }
+            )
+            mock_find.return_value = AsyncMock()
+            mock_find.return_value.to_list = AsyncMock(return_value=[existing])
+
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                created, duplicate = await asyncio.gather(
+                    client.post(
+                        "/review/",
+                        json={"location": {"latitude": 10.36288, "longitude": -74.119442}, "category": {"name": "Foo"}},
+                    ),
+                    client.post(
+                        "/review/", json={"location": {"latitude": 1.0, "longitude": 2.0}, "category": {"name": "Foo"}}
+                    ),
+                )
+
+            assert created.json()["message"] == "Location category review added successfully"
+            assert created.json()["data"][0]["category"] == {"name": "Foo"}
+            assert duplicate.json()["message"] == "Location category review already exists"
+            assert duplicate.json()["data"][0]["_id"] == str(existing_id)
+
+            mock_bulk_write.assert_awaited_once()
+            operations = mock_bulk_write.call_args.args[0]
+            assert [operation._upsert for operation in operations] == [True, True]
+            assert mock_find.call_args.args[0] == {
+                "$or": [{"location.latitude": 1.0, "location.longitude": 2.0, "category_id": 2}]
+            }
+            assert heatmap_writes.await_count == 1
+    finally:
+        await create_queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_review_write_behind():
+    found_id, missing_id = ObjectId(), ObjectId()
+    update_queue.start()
+    try:
+        with patch.object(update_queue, "max_batch", 2), patch.object(update_queue, "max_delay", 5), patch(
+            "app.database.reviews_collection.find"
+        ) as mock_find, patch(
+            "app.database.reviews_collection.bulk_write", new_callable=AsyncMock
+        ) as mock_bulk_write, patch(
+            "app.database.heatmap_collection.bulk_write", new_callable=AsyncMock
+        ), patch(
+            "app.database.history_collection.bulk_write", new_callable=AsyncMock
+        ) as history_writes:
+            mock_find.return_value = AsyncMock()
+            mock_find.return_value.to_list = AsyncMock(
+                return_value=[
+                    {
+                        "_id": found_id,
+                        "location": {"latitude": 1.0, "longitude": 2.0},
+                        "category": {"name": "Foo"},
+                        "geohash": "s00twy01mt",
+                        "last_reviewed": None,
+                    }
+                ]
+            )
+
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                updated, missing = await asyncio.gather(
+                    client.patch("/exploration-recommendations/", params={"location_id": str(found_id)}),
+                    client.patch("/exploration-recommendations/", params={"location_id": str(missing_id)}),
+                )
+
+            assert updated.status_code == 200
+            assert updated.json()["data"][0]["last_reviewed"] is not None
+            assert missing.status_code == 404
+            assert set(mock_find.call_args.args[0]["_id"]["$in"]) == {found_id, missing_id}
+            mock_bulk_write.assert_awaited_once()
+            assert [operation._filter for operation in mock_bulk_write.call_args.args[0]] == [{"_id": found_id}]
+            assert [bucket._filter["review_id"] for bucket in history_writes.call_args.args[0]] == [found_id]
+    finally:
+        await update_queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_review_write_behind_full_queue():
+    update_queue.start()
+    try:
+        with patch.object(update_queue, "submit", AsyncMock(side_effect=WriteQueueFull("Too many pending writes."))):
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                response = await client.patch("/exploration-recommendations/", params={"location_id": str(ObjectId())})
+            assert response.status_code == 503
+            assert response.json()["detail"] == "Too many pending writes."
+    finally:
+        await update_queue.stop()